@@ -0,0 +1,34 @@
+from parser import Compiler
+from benchmark import compare, generate_corpus, run_benchmarks
+import shutil
+import tempfile
+import unittest
+
+class TestCorpusGenerator(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.paths = generate_corpus(self.directory, files=2, classes=12, members=6,
+                                     inheritance_depth=3, generic_depth=3)
+        
+    def tearDown(self) -> None:
+        shutil.rmtree(self.directory)
+        
+    def test_corpus_compiles(self):
+        compiler = Compiler(self.directory, workers=1)
+        compiler.compile_all()
+        self.assertEqual(len(compiler.class_list),24)
+        table = compiler.build_symbol_table()
+        self.assertEqual(table.validate(),[])
+        self.assertEqual(len(table.ancestors("F0C3")),3)
+        
+    def test_run_benchmarks(self):
+        results = run_benchmarks(self.directory, repeat=1, workers=1)
+        self.assertEqual(results["corpus"]["files"],2)
+        self.assertGreater(results["parse_predictive"]["nodes_per_second"],0)
+        self.assertEqual(compare(results,results),[])
+        slower = {name:dict(metrics) for name, metrics in results.items()}
+        slower["tokenise_scan"]["seconds"] *= 2
+        self.assertEqual(len(compare(slower,results)),1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+from parser import Compiler, Parser, Tokeniser
+from cache import ASTCache
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+EXAMPLE_FILE = os.path.join(os.path.dirname(__file__),"..","Point_Example.odl")
+
+class TestASTCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.cache = ASTCache(os.path.join(self.directory,"cache"))
+        self.source = os.path.join(self.directory,"point.oml")
+        shutil.copy(EXAMPLE_FILE, self.source)
+        
+    def tearDown(self) -> None:
+        shutil.rmtree(self.directory)
+        
+    def test_miss_then_hit(self):
+        self.assertIsNone(self.cache.lookup(self.source)[1])
+        tree = self.cache.compile_file(self.source)
+        key, cached = self.cache.lookup(self.source)
+        self.assertIsNotNone(cached)
+        expected_output = Parser(Tokeniser(EXAMPLE_FILE).get_tokens()).compile_program()
+        self.assertEqual(cached.to_token(),expected_output)
+        self.assertEqual(tree.to_token(),expected_output)
+        
+    def test_key_depends_on_content(self):
+        self.cache.compile_file(self.source)
+        with open(self.source,"a") as file_:
+            file_.write("\nclass Extra{}\n")
+        self.assertIsNone(self.cache.lookup(self.source)[1])
+        
+    def test_lru_eviction(self):
+        self.cache.compile_file(self.source)
+        old_key = self.cache.lookup(self.source)[0]
+        os.utime(self.cache.entry_path(old_key),(time.time()-100,time.time()-100))
+        entry_size = os.path.getsize(self.cache.entry_path(old_key))
+        self.cache.max_bytes = entry_size*3//2
+        with open(self.source,"a") as file_:
+            file_.write("\nclass Extra{}\n")
+        self.cache.compile_file(self.source)
+        self.assertFalse(os.path.exists(self.cache.entry_path(old_key)))
+        self.assertIsNotNone(self.cache.lookup(self.source)[1])
+        
+    def test_storing_a_key_again_keeps_size(self):
+        tree = self.cache.compile_file(self.source)
+        key = self.cache.lookup(self.source)[0]
+        size = self.cache.size_
+        self.cache.put(key,tree)
+        self.assertEqual(self.cache.size_,size)
+        self.assertEqual(size,sum(entry_size for _, _, entry_size in self.cache.entries()))
+        
+    def test_cached_and_uncached_decoding_agree(self):
+        with open(self.source,"wb") as file_:
+            file_.write("class Caf\u00e9{\r\n    field int x;\r\n}\r\n".encode("utf-8"))
+        tree = self.cache.compile_file(self.source)
+        compiler = Compiler(self.directory,workers=1)
+        compiler.compile_all()
+        self.assertEqual(tree.to_token(),compiler.programs[self.source].to_token())
+        self.assertEqual(tree.lines,compiler.programs[self.source].lines)
+        self.assertEqual(tree.errors,[])
+        
+    def test_invalidate_and_clear(self):
+        self.cache.compile_file(self.source)
+        self.assertTrue(self.cache.invalidate(self.source))
+        self.assertFalse(self.cache.invalidate(self.source))
+        self.cache.compile_file(self.source)
+        self.assertEqual(self.cache.clear(),1)
+        self.assertEqual(self.cache.size_,0)
+        
+    def test_compiler_uses_cache(self):
+        Compiler(self.directory,workers=1,cache=self.cache).compile_all()
+        self.assertIsNotNone(self.cache.lookup(self.source)[1])
+        compiler = Compiler(self.directory,workers=1,cache=self.cache)
+        compiler.compile_all()
+        self.assertIn("Point",compiler.class_list)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+from parser import main
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+EXAMPLE_FILE = os.path.join(os.path.dirname(__file__),"..","Point_Example.odl")
+PARSER_DIRECTORY = os.path.join(os.path.dirname(__file__),"..")
+
+def run(*argv):
+    stdout, stderr = io.StringIO(), io.StringIO()
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        status = main(list(argv))
+    return status, stdout.getvalue(), stderr.getvalue()
+
+class TestCommandLine(unittest.TestCase):
+    def test_tokenise(self):
+        status, output, _ = run("tokenise",EXAMPLE_FILE)
+        self.assertEqual(status,0)
+        self.assertEqual(output.splitlines()[:2],["2:1\tkeyword\tclass","2:7\tidentifier\tPoint"])
+        
+    def test_parse_defaults_to_example(self):
+        status, output, _ = run()
+        self.assertEqual(status,0)
+        self.assertEqual(output,run("parse",EXAMPLE_FILE)[1])
+        self.assertTrue(output.startswith("program\n"))
+        status, timed_output, errors = run("--import-time")
+        self.assertEqual(timed_output,output)
+        self.assertIn("import:",errors)
+        
+    def test_parse_errors(self):
+        with tempfile.NamedTemporaryFile("w",suffix=".odl",delete=False) as file_:
+            file_.write("class A { field int x y; }\n")
+        self.addCleanup(os.remove,file_.name)
+        status, _, errors = run("parse","--recover",file_.name)
+        self.assertEqual(status,1)
+        self.assertIn("line 1",errors)
+        status, _, errors = run("parse",file_.name + ".missing")
+        self.assertEqual(status,1)
+        self.assertIn("No such file",errors)
+        
+    def test_dump_binary(self):
+        from serializer import load
+        from parser import Parser, Tokeniser
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory,"point.odlb")
+            self.assertEqual(run("dump","--binary",EXAMPLE_FILE,output)[0],0)
+            with open(output,"rb") as file_:
+                program = load(file_).node()
+        self.assertEqual(program,Parser(Tokeniser(EXAMPLE_FILE).get_tokens()).compile_program())
+        
+    def test_stats(self):
+        status, output, errors = run("--import-time","stats",EXAMPLE_FILE)
+        self.assertEqual(status,0)
+        self.assertEqual(json.loads(output)["totals"]["files"],1)
+        self.assertIn("import:",errors)
+        
+    def test_import_is_lazy(self):
+        script = ("import sys, parser; print(sorted(m for m in ('concurrent.futures','hashlib','argparse',"
+                  "'compact_tree','grammar','symbol_table') if m in sys.modules))")
+        output = subprocess.run([sys.executable,"-c",script],cwd=PARSER_DIRECTORY,
+                                capture_output=True,text=True,check=True).stdout
+        self.assertEqual(output.strip(),"[]")
+        
+    def test_script(self):
+        result = subprocess.run([sys.executable,"parser.py","stats",EXAMPLE_FILE],cwd=PARSER_DIRECTORY,
+                                capture_output=True,text=True)
+        self.assertEqual(result.returncode,0,result.stderr)
+        self.assertEqual(json.loads(result.stdout)["totals"]["tokens"],104)
+        
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+from parser import CodeGenerator, Parser, ParserError, Tokeniser
+import os
+import tempfile
+import unittest
+
+EXAMPLE_FILE = os.path.join(os.path.dirname(__file__),"..","Point_Example.odl")
+
+SOURCE = """
+class Shape : Base {
+    static int count;
+    class_var map<str,array<Shape>> registry;
+    field float area, from;
+    constructor void Shape(int, set<str>);
+    static_method int total();
+    class_method Shape create(duck);
+}
+class Base { }
+"""
+
+def parse(lines):
+    return Parser(list(Tokeniser.iter_tokens_from_lines(lines, "scan"))).compile_program()
+
+class TestCodeGenerator(unittest.TestCase):
+    
+    def test_example_module_executes(self):
+        program = Parser(Tokeniser(EXAMPLE_FILE).get_tokens()).compile_program()
+        namespace = {}
+        exec(CodeGenerator().generate_module(program.token_children), namespace)
+        point = namespace['Point']()
+        point.x = 1
+        with self.assertRaises(AttributeError):
+            point.z = 2
+        self.assertTrue(issubclass(namespace['Rectangle'], namespace['Polygon']))
+        
+    def test_members(self):
+        program = parse(SOURCE.splitlines())
+        source = CodeGenerator().generate_module(program.token_children)
+        self.assertLess(source.index("class Base:"), source.index("class Shape(Base):"))
+        self.assertIn("__slots__ = ('area', 'from_',)", source)
+        self.assertIn("count: ClassVar[int] = None", source)
+        self.assertIn("registry: ClassVar[Dict[str, List[Shape]]] = None", source)
+        self.assertIn("def __init__(self, arg0: int, arg1: Set[str]) -> None:", source)
+        self.assertIn("    @staticmethod\n    def total() -> int:", source)
+        self.assertIn("    @classmethod\n    def create(cls, arg0: Any) -> Shape:", source)
+        namespace = {}
+        exec(source, namespace)
+        self.assertEqual(namespace['Shape'].count, None)
+        
+    def test_multiple_inheritance(self):
+        program = parse(["class Base{ field int id; }",
+                         "class Named: Base{ field str name; }",
+                         "class Sized{ field int size; }",
+                         "class File: Named, Sized{ field int mode; }",
+                         "class Empty{ }",
+                         "class Other: Empty, Sized{ }"])
+        source = CodeGenerator().generate_module(program.token_children)
+        self.assertIn("class File(Named, Sized):\n    __slots__ = ('mode',)", source)
+        self.assertIn("class Empty:\n    pass", source)
+        namespace = {}
+        exec(source, namespace)
+        file_ = namespace['File']()
+        file_.id, file_.name, file_.size, file_.mode = 1, "a", 2, 3
+        base = namespace['Base']()
+        base.id = 1
+        sized = namespace['Sized']()
+        sized.size = 1
+        
+    def test_member_clash(self):
+        program = parse(["class Shape{ field int size;", "method int size(); }"])
+        with self.assertRaises(ParserError) as context:
+            CodeGenerator().generate_module(program.token_children)
+        self.assertIn("Shape.size",str(context.exception))
+        self.assertEqual(context.exception.line,2)
+        
+    def test_cache_is_bounded(self):
+        program = parse(SOURCE.splitlines())
+        with tempfile.TemporaryDirectory() as directory:
+            generator = CodeGenerator(directory)
+            size = len(generator.generate_class(program.token_children[0]).encode())
+            bounded = CodeGenerator(directory, max_bytes=size)
+            bounded.generate_class(program.token_children[1])
+            self.assertEqual(len(os.listdir(directory)), 1)
+            self.assertLessEqual(bounded.disk_cache.size_, size)
+        
+    def test_cache(self):
+        program = parse(SOURCE.splitlines())
+        stmt = program.token_children[0]
+        with tempfile.TemporaryDirectory() as directory:
+            generator = CodeGenerator(directory)
+            source = generator.generate_class(stmt)
+            self.assertIs(generator.generate_class(parse(SOURCE.splitlines()).token_children[0]), source)
+            self.assertEqual(len(os.listdir(directory)), 1)
+            fresh = CodeGenerator(directory)
+            fresh.generate_class_ = None
+            self.assertEqual(fresh.generate_class(stmt), source)
+        
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+from parser import Token, Tokeniser, Parser
+from compact_tree import CompactTree
+import os
+import pickle
+import unittest
+
+EXAMPLE_FILE = os.path.join(os.path.dirname(__file__),"..","Point_Example.odl")
+
+class TestCompactTree(unittest.TestCase):
+    def setUp(self) -> None:
+        self.program = Parser(Tokeniser(EXAMPLE_FILE).get_tokens()).compile_program()
+        self.tree = CompactTree.from_token(self.program)
+        
+    def test_round_trip(self):
+        self.assertEqual(self.program,self.tree.to_token())
+        
+    def test_positions(self):
+        token = self.tree.to_token().token_children[0].token_children[0]
+        self.assertEqual((token.line,token.column),(2,1))
+        node = self.tree.node().token_children[0].token_children[1]
+        self.assertEqual((node.line,node.column),(None,None))
+        self.assertEqual(node.token_children[0].line,2)
+        
+    def test_node_view(self):
+        node = self.tree.node()
+        self.assertEqual(node.token_type,"program")
+        self.assertEqual(len(node.token_children),4)
+        self.assertEqual(node,self.program)
+        self.assertEqual(str(node),str(self.program))
+        
+    def test_subtree(self):
+        node = self.tree.node().token_children[1]
+        self.assertEqual(node.to_token(),self.program.token_children[1])
+        
+    def test_pickle(self):
+        tree = pickle.loads(pickle.dumps(self.tree))
+        self.assertEqual(self.program,tree.to_token())
+        
+class TestCompactToken(unittest.TestCase):
+    def test_leaf_shares_children(self):
+        a = Token('identifier','a')
+        b = Token('identifier','b')
+        self.assertIs(a.token_children,b.token_children)
+        self.assertFalse(hasattr(a,"__dict__"))
+        
+    def test_add(self):
+        root = Token('class_name')
+        root.add(Token('identifier','a'))
+        self.assertEqual(len(root.token_children),1)
+        self.assertEqual(len(Token('class_name').token_children),0)
+
+if __name__ == "__main__":
+    unittest.main()
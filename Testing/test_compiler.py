@@ -0,0 +1,85 @@
+from parser import Compiler, Parser, Tokeniser
+import os
+import shutil
+import tempfile
+import unittest
+
+EXAMPLE_FILE = os.path.join(os.path.dirname(__file__),"..","Point_Example.odl")
+
+class TestCompileAll(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        shutil.copy(EXAMPLE_FILE, os.path.join(self.directory,"point.oml"))
+        with open(os.path.join(self.directory,"shape.oml"),"w") as file_:
+            file_.write("local shapes = Polygon, Circle;\n"
+                        "class Circle: Shape.Round{\n    field float radius;\n}\n")
+        
+    def tearDown(self) -> None:
+        shutil.rmtree(self.directory)
+        
+    def check_compiler(self, workers:int):
+        compiler = Compiler(self.directory)
+        programs = compiler.compile_all(workers)
+        self.assertEqual(len(programs),2)
+        self.assertSetEqual(set(compiler.class_list),{"Point","Polygon","Rectangle","Triangle","Circle"})
+        self.assertSetEqual(set(compiler.local_variable_list),{"shapes"})
+        expected_output = Parser(Tokeniser(EXAMPLE_FILE).get_tokens()).compile_program()
+        point_file = os.path.join(self.directory,"point.oml")
+        self.assertEqual(programs[point_file].to_token(),expected_output)
+        self.assertEqual(compiler.class_list["Point"],expected_output.token_children[0])
+        
+    def test_diagnostics(self):
+        with open(os.path.join(self.directory,"broken.oml"),"w") as file_:
+            file_.write("class Good{}\nclass Bad{ field int; }\nclass Also{ method int f(; }\nclass Fine{ } $\n")
+        compiler = Compiler(self.directory)
+        compiler.compile_all(1)
+        errors = compiler.diagnostics[os.path.join(self.directory,"broken.oml")]
+        self.assertListEqual([(error.line,error.column) for error in errors],[(2,21),(3,26),(4,15)])
+        self.assertTrue({"Good","Bad","Also","Fine","Point"} <= set(compiler.class_list))
+        self.assertEqual(len(compiler.diagnostics),1)
+        
+    def test_unreadable_file(self):
+        bad_file = os.path.join(self.directory,"latin.oml")
+        with open(bad_file,"wb") as file_:
+            file_.write(b"class Caf\xe9{}\n")
+        for workers in (1,2):
+            compiler = Compiler(self.directory)
+            programs = compiler.compile_all(workers)
+            self.assertEqual(len(programs),3)
+            self.assertEqual(len(programs[bad_file].node().token_children),0)
+            self.assertEqual(list(compiler.diagnostics),[bad_file])
+            self.assertIn("Cannot read",compiler.diagnostics[bad_file][0].message)
+            self.assertIn("Point",compiler.class_list)
+        missing_file = os.path.join(self.directory,"missing.oml")
+        compiler.compile_files([missing_file],1)
+        self.assertIn(missing_file,compiler.diagnostics)
+        
+    def test_duplicate_declarations(self):
+        paths = []
+        for name, field in (("a.oml","first"),("b.oml","second")):
+            paths.append(os.path.join(self.directory,name))
+            with open(paths[-1],"w") as file_:
+                file_.write(f"local group = Point;\nclass X{{ field int {field}; }}\n")
+        compiler = Compiler(self.directory)
+        compiler.compile_files(paths[:1],1)
+        compiler.compile_files(paths[1:],1)
+        table = compiler.build_symbol_table()
+        self.assertEqual(list(table.classes["X"].fields),["second"])
+        compiler.refresh([],paths[1:])
+        self.assertEqual(compiler.declared_in["X"],paths[:1])
+        self.assertEqual(compiler.class_list["X"],compiler.programs[paths[0]].node().token_children[1])
+        self.assertIn("group",compiler.local_variable_list)
+        self.assertEqual(list(table.classes["X"].fields),["first"])
+        compiler.refresh([],paths[:1])
+        self.assertNotIn("X",compiler.class_list)
+        self.assertNotIn("X",table.classes)
+        self.assertNotIn("group",compiler.local_variable_list)
+        
+    def test_in_process(self):
+        self.check_compiler(1)
+        
+    def test_process_pool(self):
+        self.check_compiler(2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+from parser import Compiler, FileManager
+import os
+import shutil
+import tempfile
+import unittest
+
+class TestFileManager(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        for relative_path in ["a.oml","notes.txt","geometry/point.oml","geometry/shapes/polygon.oml",
+                              "geometry/shapes/draft.oml","build/generated.oml"]:
+            path = os.path.join(self.directory,relative_path)
+            os.makedirs(os.path.dirname(path),exist_ok=True)
+            with open(path,"w") as file_:
+                file_.write(f"class C{len(relative_path)}{{}}\n")
+                
+    def tearDown(self) -> None:
+        shutil.rmtree(self.directory)
+        
+    def relative(self, paths):
+        return sorted(os.path.relpath(path,self.directory).replace(os.sep,"/") for path in paths)
+        
+    def test_single_level(self):
+        self.assertListEqual(self.relative(FileManager.get_oml_files(self.directory)),["a.oml"])
+        self.assertListEqual(self.relative(FileManager(self.directory).files),["a.oml"])
+        
+    def test_recursive(self):
+        files = FileManager.iter_oml_files(self.directory,recursive=True)
+        self.assertListEqual(self.relative(files),["a.oml","build/generated.oml","geometry/point.oml",
+                                                   "geometry/shapes/draft.oml","geometry/shapes/polygon.oml"])
+        
+    def test_include_exclude(self):
+        files = FileManager.iter_oml_files(self.directory,recursive=True,include=["*.oml","*.txt"],
+                                           exclude=["build","geometry/shapes/draft.*"])
+        self.assertListEqual(self.relative(files),["a.oml","geometry/point.oml",
+                                                   "geometry/shapes/polygon.oml","notes.txt"])
+        
+    def test_symlink_loop(self):
+        try:
+            os.symlink(self.directory,os.path.join(self.directory,"geometry","loop"))
+        except (OSError,NotImplementedError):
+            self.skipTest("symbolic links are not supported")
+        files = list(FileManager.iter_oml_files(self.directory,recursive=True))
+        self.assertEqual(len(files),5)
+        files = list(FileManager.iter_oml_files(self.directory,recursive=True,follow_symlinks=False))
+        self.assertEqual(len(files),5)
+        
+    def test_lazy_discovery(self):
+        manager = FileManager(self.directory,recursive=True)
+        iterator = manager.iter_files()
+        self.assertTrue(next(iterator).endswith("a.oml"))
+        self.assertIsNone(manager.files_)
+        list(iterator)
+        self.assertEqual(len(manager.files),5)
+        
+    def test_compiler_recursive(self):
+        compiler = Compiler(self.directory,workers=2,recursive=True,exclude=["build"])
+        compiler.compile_all()
+        self.assertEqual(len(compiler.programs),4)
+        self.assertEqual(len(compiler.class_list),4)
+
+if __name__ == "__main__":
+    unittest.main()
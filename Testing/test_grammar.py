@@ -0,0 +1,29 @@
+from grammar import Grammar, GrammarError
+import os
+import unittest
+
+GRAMMAR_FILE = os.path.join(os.path.dirname(__file__),"..","grammar.txt")
+
+class TestGrammar(unittest.TestCase):
+    def setUp(self) -> None:
+        self.grammar = Grammar.from_file(GRAMMAR_FILE)
+        
+    def test_first_sets(self):
+        self.assertEqual(self.grammar.first("program"),{"local","class"})
+        self.assertEqual(self.grammar.first("class_var_dec"),{"field","static","class_var"})
+        self.assertEqual(self.grammar.first("method_dec"),
+                         {"override","constructor","method","static_method","class_method"})
+        self.assertEqual(self.grammar.first("container_type"),{"array","set","map"})
+        
+    def test_optional_prefix_is_nullable(self):
+        grammar = Grammar.from_text("a: 'x'? 'y'\nb: a* 'z'")
+        self.assertEqual(grammar.first("a"),{"x","y"})
+        self.assertEqual(grammar.first("b"),{"x","y","z"})
+        
+    def test_conflict(self):
+        grammar = Grammar.from_text("a: 'x' 'y'\nb: 'x' 'z'")
+        with self.assertRaises(GrammarError):
+            grammar.predict(["a","b"])
+
+if __name__ == "__main__":
+    unittest.main()
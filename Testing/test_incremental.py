@@ -0,0 +1,83 @@
+from parser import Parser, Tokeniser
+from incremental import IncrementalParser
+import os
+import unittest
+
+EXAMPLE_FILE = os.path.join(os.path.dirname(__file__),"..","Point_Example.odl")
+
+def full_parse(text:str):
+    return Parser(Tokeniser.scan(text),predictive=True).compile_program()
+
+def recovering_parse(text:str):
+    parser = Parser(Tokeniser.scan(text),predictive=True,recover=True)
+    return parser.compile_program(), [str(error) for error in parser.errors]
+
+class TestIncrementalParser(unittest.TestCase):
+    def setUp(self) -> None:
+        with open(EXAMPLE_FILE) as file_:
+            self.document = IncrementalParser(file_.read())
+            
+    def test_initial_parse(self):
+        self.assertEqual(self.document.program,full_parse(self.document.text))
+        
+    def test_edit_inside_class(self):
+        old_children = self.document.program.token_children
+        # "field int x, y;" -> "field int x, y, z;" in class Point
+        program = self.document.edit(2,18,2,18,", z")
+        self.assertEqual(program,full_parse(self.document.text))
+        self.assertEqual(self.document.last_region,(1,6))
+        self.assertIsNot(program.token_children[0],old_children[0])
+        for old, new in zip(old_children[1:],program.token_children[1:]):
+            self.assertIs(old,new)
+            
+    def test_multi_line_edit_shifts_spans(self):
+        old_children = self.document.program.token_children
+        program = self.document.edit(9,0,9,0,"    method int getSize();\n    method int getDepth();\n")
+        self.assertEqual(program,full_parse(self.document.text))
+        self.assertIs(old_children[0],program.token_children[0])
+        self.assertIs(old_children[3],program.token_children[3])
+        self.document.edit(23,0,23,0,"    method int getWidth();\n")
+        self.assertEqual(self.document.program,full_parse(self.document.text))
+        
+    def test_positions_follow_edits(self):
+        self.document.edit(0,0,0,0,"\n\n")
+        triangle = self.document.program.token_children[3]
+        self.assertEqual(triangle.token_children[0].line,23)
+        
+    def test_unbalanced_edit_recovers(self):
+        self.document.edit(6,0,6,1,"")
+        self.assertEqual(len(self.document.errors),1)
+        self.assertEqual(len(self.document.program.token_children),3)
+        self.assertEqual((self.document.program,[str(error) for error in self.document.errors]),
+                         recovering_parse(self.document.text))
+        self.document.edit(6,0,6,0,"}")
+        self.assertEqual(self.document.errors,[])
+        self.assertEqual(self.document.program,full_parse(self.document.text))
+        
+    def test_new_statement(self):
+        program = self.document.edit(6,1,6,1,"\nlocal group = Point, Polygon;")
+        self.assertEqual(program,full_parse(self.document.text))
+        self.assertEqual(program.token_children[1].token_type,"local_var_dec_stmt")
+
+    def test_statements_sharing_a_line(self):
+        document = IncrementalParser('class A{ field int x; } class B{\n field int y;\n}\nclass C{\n}')
+        program = document.edit(1,12,1,12,', z')
+        self.assertEqual(len(program.token_children),3)
+        self.assertEqual(program,full_parse(document.text))
+        program = document.edit(0,20,0,20,', w')
+        self.assertEqual(program,full_parse(document.text))
+        
+    def test_error_keeps_following_statements(self):
+        document = IncrementalParser('class A{ field int x y; }\nclass B{ }\nlocal C = B;\nclass D{ }')
+        self.assertEqual((document.program,[str(error) for error in document.errors]),
+                         recovering_parse(document.text))
+        self.assertEqual(len(document.program.token_children),4)
+        document = IncrementalParser('class A{ field int x;\n method ; }\nclass B{ }\nclass C{ }')
+        self.assertEqual(len(document.errors),1)
+        self.assertEqual(len(document.program.token_children),3)
+        program = document.edit(1,8,1,8,'int f()')
+        self.assertEqual(document.errors,[])
+        self.assertEqual(program,full_parse(document.text))
+
+if __name__ == "__main__":
+    unittest.main()
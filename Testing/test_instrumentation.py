@@ -0,0 +1,79 @@
+from parser import Compiler, Parser, Tokeniser
+from instrumentation import Metrics
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+EXAMPLE_FILE = os.path.join(os.path.dirname(__file__),"..","Point_Example.odl")
+
+class TestMetrics(unittest.TestCase):
+    def parse(self, metrics, predictive=False):
+        tokeniser = metrics.attach(Tokeniser(EXAMPLE_FILE))
+        parser = metrics.attach(Parser(tokeniser.get_tokens(),predictive=predictive),EXAMPLE_FILE)
+        return parser, parser.compile_program()
+        
+    def test_file_and_production_counts(self):
+        metrics = Metrics()
+        _, program = self.parse(metrics)
+        self.assertEqual(program,Parser(Tokeniser(EXAMPLE_FILE).get_tokens()).compile_program())
+        stats = metrics.file(EXAMPLE_FILE)
+        self.assertEqual(stats["tokens"],len(Tokeniser(EXAMPLE_FILE).get_tokens()))
+        self.assertGreater(stats["nodes"],stats["tokens"])
+        self.assertEqual(metrics.productions["compile_class_dec_stmt"]["hits"],4)
+        self.assertEqual(metrics.productions["compile_program"]["hits"],1)
+        
+    def test_backtracks(self):
+        metrics = Metrics()
+        self.parse(metrics)
+        # Each class is first tried as a local declaration
+        self.assertEqual(metrics.productions["compile_local_var_dec_stmt"]["backtracks"],4)
+        self.assertGreater(metrics.file(EXAMPLE_FILE)["backtracks"],4)
+        predictive = Metrics()
+        self.parse(predictive,predictive=True)
+        self.assertEqual(predictive.file(EXAMPLE_FILE)["backtracks"],0)
+        
+    def test_recovered_errors_are_not_backtracks(self):
+        metrics = Metrics()
+        tokens = list(Tokeniser.iter_tokens_from_lines(["class A { field int x y; }"],"scan"))
+        parser = metrics.attach(Parser(tokens,predictive=True,recover=True),"a.oml")
+        parser.compile_program()
+        stats = metrics.file("a.oml")
+        self.assertEqual(stats["errors"],1)
+        self.assertEqual(stats["backtracks"],0)
+        self.assertEqual(metrics.productions["compile_class_var_dec_stmt"]["failures"],1)
+        
+    def test_detach(self):
+        metrics = Metrics()
+        parser, _ = self.parse(metrics)
+        metrics.detach(parser)
+        self.assertEqual(vars(parser).keys() & {"compile_program","compile_class_dec_stmt"},set())
+        
+    def test_callback_and_report(self):
+        events = []
+        metrics = Metrics(lambda event, data: events.append(event))
+        self.parse(metrics)
+        self.assertEqual(events.count("tokenise"),1)
+        self.assertEqual(events.count("parse"),1)
+        self.assertIn("backtrack",events)
+        report = json.loads(metrics.to_json())
+        self.assertEqual(report["totals"]["files"],1)
+        seconds = [stats["seconds"] for stats in report["productions"].values()]
+        self.assertEqual(seconds,sorted(seconds,reverse=True))
+        
+    def test_compiler(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree,directory)
+        for name in ("a.oml","b.oml"):
+            shutil.copy(EXAMPLE_FILE,os.path.join(directory,name))
+        metrics = Metrics()
+        compiler = Compiler(directory,workers=2,metrics=metrics)
+        compiler.compile_all()
+        self.assertEqual(len(compiler.class_list),4)
+        self.assertEqual(metrics.discovery["files"],2)
+        self.assertEqual(metrics.report()["totals"]["files"],2)
+        self.assertEqual(metrics.productions["compile_class_dec_stmt"]["hits"],8)
+        
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,12 @@
-from parser import Token, Tokeniser
+from parser import Token, Tokeniser, ParserError, Parser, StreamParser, hash_cons
+from parser import KIND_IDENTIFIER, KIND_KEYWORD, KIND_NODE, KIND_SYMBOL
+import io
+import os
+import tempfile
 import unittest
 
+EXAMPLE_FILE = os.path.join(os.path.dirname(__file__),"..","Point_Example.odl")
+
 class TestTokeniserLine1(unittest.TestCase):
     def setUp(self) -> None:
         self.expected_output = [Token('keyword','class'), 
@@ -175,5 +181,310 @@ class TestTokeniserLine9(unittest.TestCase):
         actual_output = Tokeniser(line).get_tokens()
         self.assertListEqual(self.expected_output,actual_output)
         
+class TestScanner(unittest.TestCase):
+    lines = ["class A : B , C , D {",
+             "class A:B,C,D{ //This is a comment",
+             "local class_group=B,C;",
+             "field int x,y ;",
+             "override method bool contain(Point);",
+             "method array<Point> getConvexHull();"]
+    
+    def test_matches_line_mode(self):
+        for line in self.lines:
+            expected_output = Tokeniser(line).get_tokens()
+            actual_output = Tokeniser(line,"scan").get_tokens()
+            self.assertListEqual(expected_output,actual_output)
+            
+    def test_matches_file_mode(self):
+        expected_output = Tokeniser(EXAMPLE_FILE).get_tokens()
+        actual_output = Tokeniser(EXAMPLE_FILE,"scan").get_tokens()
+        self.assertListEqual(expected_output,actual_output)
+            
+    def test_multi_line_buffer(self):
+        buffer = "class A{\n/* block\n * comment\n */\n  field int x;\n}"
+        expected_output = [Token('keyword','class'),
+                           Token('identifier','A'),
+                           Token('symbol','{'),
+                           Token('keyword','field'),
+                           Token('keyword','int'),
+                           Token('identifier','x'),
+                           Token('symbol',';'),
+                           Token('symbol','}')]
+        actual_output = Tokeniser.scan(buffer)
+        self.assertListEqual(expected_output,actual_output)
+        
+    def test_keyword_prefix_is_identifier(self):
+        actual_output = Tokeniser.scan("classes class_var")
+        self.assertListEqual([Token('identifier','classes'),Token('keyword','class_var')],actual_output)
+        
+    def test_unidentifiable_token(self):
+        with self.assertRaises(ParserError):
+            Tokeniser.scan("field int 1x;")
+
+class TestStreamParser(unittest.TestCase):
+    def test_iter_tokens_matches_get_tokens(self):
+        for mode in Tokeniser.modes:
+            tokeniser = Tokeniser(EXAMPLE_FILE,mode)
+            self.assertListEqual(tokeniser.get_tokens(),list(tokeniser.iter_tokens()))
+    
+    def test_matches_list_parser(self):
+        expected_output = Parser(Tokeniser(EXAMPLE_FILE).get_tokens()).compile_program()
+        actual_output = StreamParser(Tokeniser(EXAMPLE_FILE).iter_tokens()).compile_program()
+        self.assertEqual(expected_output,actual_output)
+        
+    def test_window_stays_bounded(self):
+        source = "class A{ field int x; }\n" * 200
+        parser = StreamParser(Tokeniser(source).iter_tokens())
+        peak = 0
+        for _ in parser.iter_program():
+            peak = max(peak,len(parser.tokens.window))
+        self.assertLessEqual(peak,2)
+
+class TestPredictiveParser(unittest.TestCase):
+    def test_matches_backtracking_parser(self):
+        tokens = Tokeniser(EXAMPLE_FILE).get_tokens()
+        expected_output = Parser(tokens).compile_program()
+        parser = Parser(tokens,predictive=True)
+        actual_output = parser.compile_program()
+        self.assertEqual(expected_output,actual_output)
+        self.assertEqual(parser.c_index,len(tokens))
+        
+    def test_table_from_grammar(self):
+        tables = Parser.predict_tables()
+        self.assertEqual(tables["program"]["local"],"compile_local_var_dec_stmt")
+        self.assertEqual(tables["class_body"]["override"],"compile_class_method_dec_stmt")
+        self.assertEqual(tables["class_body"]["class_var"],"compile_class_var_dec_stmt")
+        
+    def test_no_exceptions_on_valid_input(self):
+        tokens = Tokeniser("local g = A, B; class A { field int x; method int f(); }").get_tokens()
+        parser = Parser(tokens,predictive=True)
+        compile_class_var_dec_stmt = parser.compile_class_var_dec_stmt
+        def no_backtrack():
+            self.assertEqual(parser.current_value,"field")
+            return compile_class_var_dec_stmt()
+        parser.compile_class_var_dec_stmt = no_backtrack
+        self.assertEqual(len(parser.compile_program().token_children),2)
+        
+    def test_native_parameter_types(self):
+        tokens = Tokeniser("class A { method int f(int, array<B>); }").get_tokens()
+        for predictive in (False,True):
+            parser = Parser(tokens,predictive)
+            program = parser.compile_program()
+            self.assertEqual(parser.c_index,len(tokens))
+            type_list = program.token_children[0].token_children[3].token_children[4]
+            self.assertEqual(len(type_list.token_children),3)
+        
+    def test_mixed_parameter_types(self):
+        for source, expected_kinds in (("class A { method float f(int, Point); }",["keyword","class_name"]),
+                                       ("class A { method float f(Point, str, map<int,B>); }",
+                                        ["class_name","keyword","keyword"])):
+            tokens = Tokeniser.scan(source)
+            expected_output = Parser(tokens).compile_program()
+            parser = Parser(tokens,predictive=True,recover=True)
+            self.assertEqual(parser.compile_program(),expected_output)
+            self.assertEqual(parser.errors,[])
+            method = expected_output.token_children[0].token_children[3]
+            self.assertEqual(method.token_children[1].token_children[0].token_value,"float")
+            type_list = method.token_children[4]
+            self.assertEqual([child.token_children[0].token_type for child in type_list.token_children
+                              if child.token_type == "var_type"],expected_kinds)
+        
+    def test_stream_parser(self):
+        expected_output = Parser(Tokeniser(EXAMPLE_FILE).get_tokens()).compile_program()
+        actual_output = StreamParser(Tokeniser(EXAMPLE_FILE).iter_tokens(),predictive=True).compile_program()
+        self.assertEqual(expected_output,actual_output)
+        
+    def test_stream_parser_recovery(self):
+        source = "class A{ field int x y; method int f(; }\nclass B{ }\nlocal C = B;\nclass D{ field int; }"
+        for predictive in (False,True):
+            parser = Parser(Tokeniser.scan(source),predictive,recover=True)
+            stream_parser = StreamParser(iter(Tokeniser.scan(source)),predictive,recover=True)
+            self.assertEqual(stream_parser.compile_program(),parser.compile_program())
+            self.assertEqual([str(error) for error in stream_parser.errors],[str(error) for error in parser.errors])
+            self.assertEqual(len(stream_parser.errors),3)
+
+class TestRender(unittest.TestCase):
+    def test_nested_output(self):
+        tokens = Tokeniser("class A{ field array<B> x; }").get_tokens()
+        output = str(Parser(tokens).compile_program().token_children[0].token_children[3])
+        expected_output = ("class_var_dec_stmt\n"
+                           "  \u2514 keyword field\n"
+                           "  \u2514 var_type\n"
+                           "  \u2502   \u2514 keyword array\n"
+                           "  \u2502   \u2514 symbol <\n"
+                           "  \u2502   \u2514 var_type\n"
+                           "  \u2502   \u2502   \u2514 class_name\n"
+                           "  \u2502   \u2502   \u2502   \u2514 identifier B\n"
+                           "  \u2502   \u2502   \u2502 \n"
+                           "  \u2502   \u2502 \n"
+                           "  \u2502   \u2514 symbol >\n"
+                           "  \u2502 \n"
+                           "  \u2514 var_name\n"
+                           "  \u2502   \u2514 identifier x\n"
+                           "  \u2502 \n"
+                           "  \u2514 symbol ;\n"
+                           "\n")
+        self.assertEqual(output,expected_output)
+        
+    def test_deep_tree(self):
+        root = Token("var_type")
+        node = root
+        for _ in range(1500):
+            child = Token("var_type")
+            node.add(child)
+            node = child
+        node.add(Token("keyword","int"))
+        buffer = io.StringIO()
+        root.render(buffer)
+        self.assertEqual(buffer.getvalue().count("keyword int"),1)
+        
+    def test_dump(self):
+        program = Parser(Tokeniser(EXAMPLE_FILE).get_tokens()).compile_program()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory,"tree.txt")
+            program.dump(path)
+            with open(path,encoding="utf-8") as file_:
+                self.assertEqual(file_.read(),str(program))
+
+class TestTokenHash(unittest.TestCase):
+    def setUp(self) -> None:
+        self.program = Parser(Tokeniser(EXAMPLE_FILE).get_tokens()).compile_program()
+        self.other = Parser(Tokeniser(EXAMPLE_FILE,"scan").get_tokens()).compile_program()
+        
+    def test_equal_trees_hash_equal(self):
+        self.assertEqual(hash(self.program),hash(self.other))
+        self.assertEqual(len({self.program,self.other}),1)
+        self.assertNotEqual(hash(self.program.token_children[0]),hash(self.program.token_children[1]))
+        
+    def test_add_resets_hash(self):
+        root = Token("var_name")
+        before = hash(root)
+        root.add(Token("identifier","x"))
+        self.assertNotEqual(before,hash(root))
+        
+    def test_equality_ignores_stale_hashes(self):
+        def build(name:str)->Token:
+            root = Token("class_dec_stmt")
+            child = Token("class_name")
+            child.add(Token("identifier",name))
+            root.add(child)
+            return root
+        tree, other = build("A"), build("B")
+        hash(tree), hash(other)
+        other.token_children[0].token_children[0].token_value = "A"
+        self.assertEqual(tree,other)
+        other.token_children[0].add(Token("symbol","."))
+        hash(other)
+        tree.token_children[0].add(Token("symbol","."))
+        self.assertEqual(tree,other)
+        
+    def test_hash_cons_shares_subtrees(self):
+        table = {}
+        program = hash_cons(self.program,table)
+        other = hash_cons(self.other,table)
+        self.assertIs(program,other)
+        polygon = program.token_children[1]
+        field_type = polygon.token_children[3].token_children[1]
+        method_type = polygon.token_children[4].token_children[1]
+        self.assertIs(field_type,method_type)
+        # Rectangle and Triangle declare identical members
+        self.assertIs(program.token_children[2].token_children[5],program.token_children[3].token_children[5])
+        
+    def test_deep_tree(self):
+        def build(depth:int)->Token:
+            root = Token("var_type")
+            node = root
+            for _ in range(depth):
+                child = Token("var_type")
+                node.add(child)
+                node = child
+            return root
+        self.assertIsInstance(hash(build(5000)),int)
+        self.assertEqual(build(5000),build(5000))
+        self.assertNotEqual(build(5000),build(4999))
+
+class TestPositions(unittest.TestCase):
+    def test_token_positions(self):
+        for mode in Tokeniser.modes:
+            tokens = Tokeniser(EXAMPLE_FILE,mode).get_tokens()
+            positions = [(token.token_value,token.line,token.column) for token in tokens[:6]]
+            self.assertListEqual(positions,[("class",2,1),("Point",2,7),("{",2,12),
+                                            ("field",3,5),("int",3,11),("x",3,15)])
+            
+    def test_error_position(self):
+        tokens = Tokeniser("class A {\n  field int x\n}","scan").get_tokens()
+        parser = Parser(tokens)
+        parser.compile_program()
+        self.assertEqual(len(parser.errors),1)
+        self.assertEqual((parser.errors[0].line,parser.errors[0].column),(3,1))
+        self.assertEqual(str(parser.errors[0]),"Expected symbol: ;, Actual: } at line 3, column 1")
+
+    def test_line_mode_error_column(self):
+        with self.assertRaises(ParserError) as context:
+            Tokeniser("x").get_tokens_from_line("class A1a { field int 1a; }",3)
+        self.assertEqual((context.exception.line,context.exception.column),(3,23))
+
+class TestErrorRecovery(unittest.TestCase):
+    source = ("class A {\n"
+              "  field int x y;\n"
+              "  method int f();\n"
+              "}\n"
+              "class B : {\n"
+              "  field int z;\n"
+              "}\n"
+              "local g = A, B;\n"
+              "class C {\n"
+              "  method array<int f();\n"
+              "  field Point p;\n"
+              "}\n")
+    
+    def check_recovery(self, predictive:bool):
+        parser = Parser(Tokeniser.scan(self.source),predictive,recover=True)
+        program = parser.compile_program()
+        self.assertListEqual([error.line for error in parser.errors],[2,5,10])
+        names = [stmt.token_type for stmt in program.token_children]
+        self.assertListEqual(names,["class_dec_stmt","local_var_dec_stmt","class_dec_stmt"])
+        class_c = program.token_children[2]
+        self.assertEqual(len([c for c in class_c.token_children if c.token_type == "class_var_dec_stmt"]),1)
+        
+    def test_backtracking(self):
+        self.check_recovery(False)
+        
+    def test_predictive(self):
+        self.check_recovery(True)
+        
+    def test_missing_brace(self):
+        parser = Parser(Tokeniser.scan("class A {\n field int x;\nclass B { }"),True,recover=True)
+        program = parser.compile_program()
+        self.assertEqual(len(parser.errors),1)
+        self.assertEqual(len(program.token_children),1)
+        
+    def test_without_recovery_error_is_kept(self):
+        parser = Parser(Tokeniser.scan(self.source),True)
+        program = parser.compile_program()
+        self.assertEqual(len(program.token_children),0)
+        self.assertEqual(len(parser.errors),1)
+
+class TestVocabulary(unittest.TestCase):
+    def test_kinds(self):
+        tokens = Tokeniser.scan("class Point { field int x; }")
+        self.assertEqual([token.kind for token in tokens[:3]],[KIND_KEYWORD,KIND_IDENTIFIER,KIND_SYMBOL])
+        self.assertEqual(Token("class_dec_stmt").kind,KIND_NODE)
+        self.assertEqual(Tokeniser.parse_token("int").kind,KIND_KEYWORD)
+        
+    def test_identifiers_are_interned(self):
+        source = "class Point { field Point next; }\nclass Polygon { field array<Point> points; }"
+        names = [token.token_value for token in Tokeniser.scan(source) if token.token_value == "Point"]
+        line_names = [token.token_value for token in Tokeniser.iter_tokens_from_lines(source.splitlines())
+                      if token.token_value == "Point"]
+        self.assertEqual(len(names),3)
+        self.assertTrue(all(name is names[0] for name in names + line_names))
+        
+    def test_contain_symbol(self):
+        self.assertEqual(Tokeniser.contain_symbol("array<Point>"),"<")
+        self.assertFalse(Tokeniser.contain_symbol("Point"))
+        self.assertEqual([token.token_value for token in Tokeniser.parse_token("map<str,Point>;")],
+                         ["map","<","str",",","Point",">",";"])
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
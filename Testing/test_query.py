@@ -0,0 +1,64 @@
+from parser import Compiler, Parser, Tokeniser
+from query import QueryError, SchemaIndex
+import os
+import shutil
+import tempfile
+import unittest
+
+EXAMPLE_FILE = os.path.join(os.path.dirname(__file__),"..","Point_Example.odl")
+
+class TestSchemaIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        program = Parser(Tokeniser(EXAMPLE_FILE).get_tokens()).compile_program()
+        self.index = SchemaIndex.from_programs([program])
+        
+    def names(self, symbols):
+        return sorted(f"{symbol.owner}.{symbol.name}" for symbol in symbols)
+        
+    def test_fields(self):
+        self.assertEqual(self.names(self.index.fields_of_type("array< Point >")),["Polygon.points"])
+        self.assertEqual(self.names(self.index.fields_of_type("Point")),["Point.next","Point.prev"])
+        self.assertEqual(self.names(self.index.fields_referencing("Point")),
+                         ["Point.next","Point.prev","Polygon.points"])
+        self.assertEqual(self.index.fields_of_type("map<str,Point>"),())
+        
+    def test_methods(self):
+        self.assertEqual(self.names(self.index.methods_taking("Point")),
+                         ["Point.getDistance","Polygon.contain","Rectangle.contain","Triangle.contain"])
+        self.assertEqual(self.names(self.index.methods_returning("array<Point>")),["Polygon.getConvexHull"])
+        self.assertEqual(len(self.index.methods_named("getArea")),3)
+        self.assertEqual(sorted(self.index.overriding("getArea")),["Rectangle","Triangle"])
+        self.assertEqual(self.index.overriding("getLength"),())
+        
+    def test_overloads(self):
+        program = Parser(Tokeniser.scan("class Line{ field Point a, b;\n"
+                                        "    method float dist(Point);\n"
+                                        "    method float dist(Line);\n"
+                                        "    override method int size();\n"
+                                        "    override method int size(int);\n}")).compile_program()
+        index = SchemaIndex.from_programs([program])
+        self.assertEqual(len(index.methods_named("dist")),2)
+        self.assertEqual(self.names(index.methods_taking("Line")),["Line.dist"])
+        self.assertEqual(self.names(index.methods_taking("Point")),["Line.dist"])
+        self.assertEqual(len(index.methods_returning("float")),2)
+        self.assertEqual(index.overriding("size"),("Line",))
+        
+    def test_batch(self):
+        queries = [("overriding","contain"),("fields_of_type","array<Point>"),
+                   ("methods_referencing","Polygon"),("overriding","getArea")]
+        results = self.index.batch(queries)
+        self.assertEqual(results,[getattr(self.index,kind)(argument) for kind, argument in queries])
+        with self.assertRaises(QueryError):
+            self.index.batch([("fields_named","x")])
+            
+    def test_from_compiler(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree,directory)
+        shutil.copy(EXAMPLE_FILE,os.path.join(directory,"point.oml"))
+        compiler = Compiler(directory,workers=1)
+        compiler.compile_all()
+        index = SchemaIndex.from_compiler(compiler)
+        self.assertEqual(self.names(index.fields_referencing("Point")),["Point.next","Point.prev","Polygon.points"])
+        
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+from parser import Parser, Tokeniser
+from compact_tree import CompactTree
+import serializer
+from serializer import FormatError, dumps, loads, loads_tree
+import io
+import os
+import pickle
+import unittest
+
+EXAMPLE_FILE = os.path.join(os.path.dirname(__file__),"..","Point_Example.odl")
+
+def walk(root):
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(node.token_children)
+
+class TestSerializer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.program = Parser(Tokeniser(EXAMPLE_FILE).get_tokens()).compile_program()
+        
+    def test_round_trip(self):
+        output = loads(dumps(self.program))
+        self.assertEqual(output,self.program)
+        self.assertEqual([(node.line,node.column) for node in walk(output)],
+                         [(node.line,node.column) for node in walk(self.program)])
+        
+    def test_without_positions(self):
+        data = dumps(self.program,positions=False)
+        self.assertLess(len(data),len(dumps(self.program)))
+        output = loads(data)
+        self.assertEqual(output,self.program)
+        self.assertTrue(all(node.line is None for node in walk(output)))
+        
+    def test_compact_tree_with_errors(self):
+        tokens = Tokeniser.iter_tokens_from_lines(["class A { field int x y; }"],"scan")
+        parser = Parser(list(tokens),recover=True)
+        tree = CompactTree.from_token(parser.compile_program(),parser.errors)
+        output = loads_tree(dumps(tree))
+        self.assertEqual(output.to_token(),tree.to_token())
+        self.assertEqual([str(error) for error in output.errors],[str(error) for error in tree.errors])
+        self.assertEqual(len(output.errors),1)
+        
+    def test_smaller_than_pickle(self):
+        self.assertLess(len(dumps(self.program))*4,len(pickle.dumps(self.program)))
+        
+    def test_file_round_trip(self):
+        buffer = io.BytesIO()
+        serializer.dump(self.program,buffer)
+        buffer.seek(0)
+        tree = serializer.load(buffer)
+        self.assertIsInstance(tree,CompactTree)
+        self.assertEqual(tree.node(),self.program)
+        
+    def test_invalid_data(self):
+        data = dumps(self.program)
+        with self.assertRaises(FormatError):
+            loads(b"PK" + data)
+        with self.assertRaises(FormatError):
+            loads(data[:4] + bytes([serializer.VERSION+1]) + data[5:])
+        with self.assertRaises(FormatError):
+            loads(data[:len(data)//2])
+        
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+from cache import ASTCache
+from parser import Parser, Tokeniser
+from serializer import loads
+from service import CompileService
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import base64
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+EXAMPLE_FILE = os.path.join(os.path.dirname(__file__),"..","Point_Example.odl")
+
+class TestCompileService(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree,self.directory)
+        self.files = []
+        for name in ("a.oml","b.oml"):
+            self.files.append(os.path.join(self.directory,name))
+            shutil.copy(EXAMPLE_FILE,self.files[-1])
+        self.broken = os.path.join(self.directory,"broken.oml")
+        with open(self.broken,"w") as file_:
+            file_.write("class Broken : Missing { field int x y; }\n")
+        self.executor = ThreadPoolExecutor(2)
+        self.addCleanup(self.executor.shutdown)
+        self.cache = ASTCache(os.path.join(self.directory,"cache"))
+        self.service = CompileService(cache=self.cache,max_pending=2,executor=self.executor)
+        
+    async def asyncTearDown(self) -> None:
+        await self.service.close()
+        
+    async def test_identical_sources_compile_once(self):
+        trees = await self.service.compile(self.files*3)
+        expected_output = Parser(Tokeniser(EXAMPLE_FILE).get_tokens()).compile_program()
+        self.assertEqual(trees[self.files[0]].to_token(),expected_output)
+        self.assertEqual(self.service.stats["compiled"],1)
+        self.assertEqual(self.service.stats["shared"],5)
+        self.assertEqual(self.service.in_flight,{})
+        
+    async def test_shared_cache(self):
+        await self.service.compile_file(self.files[0])
+        other = CompileService(cache=self.cache,executor=self.executor)
+        tree = await other.compile_file(self.files[1])
+        self.assertEqual(other.stats,{"requests":1,"compiled":0,"cache_hits":1,"shared":0})
+        self.assertEqual(len(tree.errors),0)
+        
+    async def test_back_pressure(self):
+        sources = []
+        for index in range(6):
+            sources.append(os.path.join(self.directory,f"c{index}.oml"))
+            with open(sources[-1],"w") as file_:
+                file_.write(f"class C{index} {{ }}\n")
+        await self.service.compile(sources)
+        self.assertEqual(self.service.stats["compiled"],6)
+        self.assertEqual(self.service.slots._value,2)
+        
+    async def test_validate(self):
+        result = await self.service.validate(self.files + [self.broken])
+        self.assertEqual(result["files"][self.files[0]],[])
+        self.assertEqual(len(result["files"][self.broken]),1)
+        self.assertEqual(len(result["symbols"]),1)
+        self.assertIn("Missing",result["symbols"][0])
+        
+    async def test_socket_protocol(self):
+        server = await self.service.serve()
+        self.addAsyncCleanup(server.wait_closed)
+        self.addCleanup(server.close)
+        host, port = server.sockets[0].getsockname()[:2]
+        reader, writer = await asyncio.open_connection(host,port)
+        requests = [{"id":1,"method":"compile","paths":self.files[:1],"trees":True},
+                    {"id":2,"method":"validate","paths":[self.broken]},
+                    {"id":3,"method":"compile","paths":[os.path.join(self.directory,"missing.oml")]},
+                    {"id":4,"method":"delete","paths":[]}]
+        for request in requests:
+            writer.write(json.dumps(request).encode() + b"\n")
+        writer.write(b"not json\n")
+        await writer.drain()
+        responses = {}
+        for _ in range(len(requests)+1):
+            response = json.loads(await reader.readline())
+            responses[response["id"]] = response
+        writer.close()
+        await writer.wait_closed()
+        entry = responses[1]["result"][self.files[0]]
+        self.assertEqual(entry["declarations"]["classes"],["Point","Polygon","Rectangle","Triangle"])
+        expected_output = Parser(Tokeniser(EXAMPLE_FILE).get_tokens()).compile_program()
+        self.assertEqual(loads(base64.b64decode(entry["tree"])),expected_output)
+        self.assertEqual(len(responses[2]["result"]["symbols"]),1)
+        self.assertIn("error",responses[3])
+        self.assertIn("Unknown method",responses[4]["error"])
+        self.assertEqual(responses[None]["error"],"Malformed request")
+        
+    async def test_invalid_requests(self):
+        response = await self.service.handle_request({"id":5,"method":"compile","paths":[None]})
+        self.assertEqual(response,{"id":5,"error":"paths must be a list of strings"})
+        response = await self.service.handle_request({"id":6,"method":"validate","paths":"a.oml"})
+        self.assertIn("error",response)
+        
+    async def test_unexpected_failure(self):
+        async def fail(paths):
+            raise RuntimeError("pool broken")
+        self.service.compile = fail
+        response = await self.service.handle_request({"id":7,"method":"compile","paths":self.files})
+        self.assertEqual(response,{"id":7,"error":"RuntimeError: pool broken"})
+        
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+from parser import ParserError, Token, Tokeniser
+from source_buffer import SourceBuffer
+import os
+import tempfile
+import unittest
+
+EXAMPLE_FILE = os.path.join(os.path.dirname(__file__),"..","Point_Example.odl")
+
+class TestSourceBuffer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+        
+    def write(self, content:str)->str:
+        path = os.path.join(self.directory.name,"source.oml")
+        with open(path,"w",encoding="utf-8") as file_:
+            file_.write(content)
+        return path
+        
+    def test_matches_line_mode(self):
+        self.assertListEqual(Tokeniser(EXAMPLE_FILE).get_tokens(),Tokeniser(EXAMPLE_FILE,"mmap").get_tokens())
+        
+    def test_offsets_and_positions(self):
+        path = self.write("class A{\n  field int x; // comment\n}")
+        with SourceBuffer(path) as buffer:
+            tokens = list(buffer.tokens())
+            self.assertEqual(tokens[0],("keyword",0,5))
+            kind, start, end = tokens[4]
+            self.assertEqual((kind,buffer.text(start,end)),("keyword","int"))
+            self.assertEqual(buffer.position(start),(2,9))
+            self.assertEqual(buffer.position(tokens[-1][1]),(3,1))
+            
+    def test_non_ascii_identifier(self):
+        path = self.write("class Café{}")
+        with SourceBuffer(path) as buffer:
+            self.assertListEqual(list(buffer.to_tokens()),[Token("keyword","class"),Token("identifier","Café"),
+                                                           Token("symbol","{"),Token("symbol","}")])
+            
+    def test_error_position(self):
+        path = self.write("class A{\n  field int 1x;\n}")
+        with SourceBuffer(path) as buffer:
+            with self.assertRaisesRegex(ParserError,"line 2, column 13"):
+                list(buffer.tokens())
+                
+    def test_invalid_utf8(self):
+        path = os.path.join(self.directory.name,"latin.oml")
+        with open(path,"wb") as file_:
+            file_.write(b"class A{\n  field int caf\xe9;\n}")
+        with SourceBuffer(path) as buffer:
+            with self.assertRaisesRegex(ParserError,"Invalid UTF-8.* at line 2, column 16"):
+                list(buffer.to_tokens())
+        with self.assertRaises(ParserError):
+            Tokeniser(path,"mmap").get_tokens()
+                
+    def test_empty_file(self):
+        with SourceBuffer(self.write("")) as buffer:
+            self.assertListEqual(list(buffer.tokens()),[])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+from parser import Compiler, Parser, Tokeniser
+from symbol_table import SymbolError, SymbolTable, type_name
+import os
+import shutil
+import tempfile
+import unittest
+
+EXAMPLE_FILE = os.path.join(os.path.dirname(__file__),"..","Point_Example.odl")
+
+def compile_text(text:str):
+    return Parser(Tokeniser.scan(text),predictive=True).compile_program()
+
+class TestSymbolTable(unittest.TestCase):
+    def setUp(self) -> None:
+        self.table = SymbolTable()
+        self.table.add_program(Parser(Tokeniser(EXAMPLE_FILE).get_tokens()).compile_program())
+        
+    def test_lookup(self):
+        self.assertEqual(len(self.table),4)
+        point = self.table.lookup("Point")
+        self.assertSetEqual(set(point.fields),{"x","y","next","prev"})
+        self.assertEqual(type_name(self.table.lookup("Polygon").fields["points"].var_type),"array<Point>")
+        self.assertIsNone(self.table.lookup("Circle"))
+        
+    def test_hierarchy(self):
+        self.assertSetEqual(self.table.subclasses("Polygon"),{"Rectangle","Triangle"})
+        self.assertSetEqual(self.table.ancestors("Rectangle"),{"Polygon"})
+        self.assertTrue(self.table.is_subclass("Triangle","Polygon"))
+        self.assertFalse(self.table.is_subclass("Polygon","Triangle"))
+        
+    def test_method_resolution(self):
+        self.assertEqual(self.table.mro("Rectangle"),("Rectangle","Polygon"))
+        self.assertEqual(self.table.resolve_method("Rectangle","getArea").owner,"Rectangle")
+        self.assertEqual(self.table.resolve_method("Rectangle","getConvexHull").owner,"Polygon")
+        self.assertIsNone(self.table.resolve_method("Rectangle","getLength"))
+        self.assertEqual(self.table.validate(),[])
+        
+    def test_aliases_and_diamond(self):
+        self.table.add_program(compile_text(
+            "local shapes = Rectangle, Triangle;\n"
+            "class Square: shapes{ override method float getArea(); }\n"))
+        self.assertEqual(self.table.mro("Square"),("Square","Rectangle","Triangle","Polygon"))
+        self.assertSetEqual(self.table.descendants("Polygon"),{"Rectangle","Triangle","Square"})
+        self.assertEqual(self.table.validate(),[])
+        
+    def test_validate(self):
+        self.table.add_program(compile_text(
+            "class Circle: Shape{ field Centre c; override method float getPerimeter(); }"))
+        messages = sorted(str(error) for error in self.table.validate())
+        self.assertListEqual(messages,["Circle.getPerimeter overrides no inherited method",
+                                       "Unknown superclass Shape of Circle",
+                                       "Unknown type Centre in Circle"])
+        
+    def test_overloads(self):
+        self.table.add_program(compile_text(
+            "class Shape{ method float dist(Point); method float dist(Polygon); method int size(); }\n"
+            "class Box: Shape{ override method float dist(Polygon); override method int size(int); }\n"))
+        self.assertEqual(len(self.table.lookup("Shape").methods["dist"]),2)
+        self.assertEqual(self.table.resolve_method("Box","dist",["Polygon"]).owner,"Box")
+        self.assertEqual(self.table.resolve_method("Box","dist",["Point"]).owner,"Shape")
+        self.assertEqual(self.table.resolve_method("Box","dist").owner,"Box")
+        self.assertIsNone(self.table.resolve_method("Box","dist",["Line"]))
+        self.assertEqual(len(self.table.overloads("Box","dist")),2)
+        self.assertListEqual([str(error) for error in self.table.validate(["Box"])],
+                             ["Box.size overrides no inherited method"])
+        
+    def test_alias_edges_follow_changes(self):
+        self.table.add_program(compile_text(
+            "local shapes = Rectangle;\nlocal all = shapes, Point;\nclass Square: all{ }\n"))
+        self.assertSetEqual(self.table.subclasses("Rectangle"),{"Square"})
+        self.table.add_local(compile_text("local shapes = Triangle;").token_children[0])
+        self.assertSetEqual(self.table.subclasses("Rectangle"),set())
+        self.assertSetEqual(self.table.subclasses("Triangle"),{"Square"})
+        self.assertEqual(self.table.mro("Square"),("Square","Triangle","Polygon","Point"))
+        self.table.remove_local("shapes")
+        self.assertSetEqual(self.table.subclasses("Triangle"),set())
+        # A class of the same name hides an alias
+        self.table.add_class(compile_text("class all{ }").token_children[0])
+        self.assertSetEqual(self.table.subclasses("Point"),set())
+        self.assertSetEqual(self.table.subclasses("all"),{"Square"})
+        self.table.remove_class("all")
+        self.assertSetEqual(self.table.subclasses("Point"),{"Square"})
+        
+    def test_cycle(self):
+        self.table.add_program(compile_text("class A: B{} class B: A{}"))
+        with self.assertRaises(SymbolError):
+            self.table.ancestors("A")
+            
+    def test_remove_class(self):
+        self.table.remove_class("Rectangle")
+        self.assertSetEqual(self.table.subclasses("Polygon"),{"Triangle"})
+
+class TestCompilerSymbolTable(unittest.TestCase):
+    def test_build_symbol_table(self):
+        directory = tempfile.mkdtemp()
+        try:
+            shutil.copy(EXAMPLE_FILE, os.path.join(directory,"point.oml"))
+            compiler = Compiler(directory,workers=1)
+            compiler.compile_all()
+            table = compiler.build_symbol_table()
+            self.assertIs(compiler.symbol_table,table)
+            self.assertEqual(table.resolve_method("Triangle","contain").owner,"Triangle")
+        finally:
+            shutil.rmtree(directory)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+from parser import Compiler
+from watch import Watcher
+import os
+import shutil
+import tempfile
+import threading
+import types
+import unittest
+from unittest import mock
+
+class TestWatcher(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.write("base.oml","class Shape{ method float getArea(); }\n")
+        self.write("shapes.oml","class Square: Shape{ override method float getArea(); }\n"
+                                "class Cube: Square{ field int depth; }\n")
+        self.watcher = Watcher(Compiler(self.directory,workers=1),use_inotify=False)
+        self.initial = self.watcher.start()
+        
+    def tearDown(self) -> None:
+        shutil.rmtree(self.directory)
+        
+    def write(self, name:str, content:str)->str:
+        path = os.path.join(self.directory,name)
+        with open(path,"w") as file_:
+            file_.write(content)
+        # Make sure the change is visible even on coarse mtime filesystems
+        stat = os.stat(path)
+        os.utime(path,ns=(stat.st_atime_ns,stat.st_mtime_ns+10**9))
+        return path
+        
+    def test_start(self):
+        self.assertSetEqual(self.initial.affected,{"Shape","Square","Cube"})
+        self.assertEqual(self.initial.errors,[])
+        self.assertIsNone(self.watcher.step())
+        
+    def test_superclass_change_revalidates_dependents(self):
+        path = self.write("base.oml","class Shape{ method float getPerimeter(); }\n")
+        event = self.watcher.step()
+        self.assertListEqual(event.changed,[path])
+        self.assertSetEqual(event.affected,{"Shape","Square","Cube"})
+        self.assertListEqual([str(error) for error in event.errors],["Square.getArea overrides no inherited method"])
+        self.assertIn("getPerimeter",self.watcher.compiler.symbol_table.lookup("Shape").methods)
+        
+    def test_leaf_change_only_touches_its_classes(self):
+        self.write("shapes.oml","class Square: Shape{ override method float getArea(); }\n")
+        event = self.watcher.step()
+        self.assertSetEqual(event.affected,{"Square","Cube"})
+        self.assertNotIn("Cube",self.watcher.compiler.class_list)
+        
+    def test_new_and_removed_files(self):
+        self.write("circle.oml","class Circle: Shape{ field float radius; }\n")
+        os.remove(os.path.join(self.directory,"shapes.oml"))
+        event = self.watcher.step()
+        self.assertEqual(len(event.changed),1)
+        self.assertEqual(len(event.removed),1)
+        self.assertSetEqual(set(self.watcher.compiler.class_list),{"Shape","Circle"})
+        self.assertSetEqual(self.watcher.compiler.symbol_table.subclasses("Shape"),{"Circle"})
+        
+    def test_run_until_stopped(self):
+        events = []
+        stop_event = threading.Event()
+        def callback(event):
+            events.append(event)
+            stop_event.set()
+        Compiler(self.directory,workers=1).watch(callback,interval=0.01,stop_event=stop_event)
+        self.assertEqual(len(events),1)
+
+    def test_recursive_inotify_watches(self):
+        flags = types.SimpleNamespace(CLOSE_WRITE=1,MOVED_TO=2,MOVED_FROM=4,CREATE=8,DELETE=16,ISDIR=32)
+        class INotify:
+            def __init__(self):
+                self.watches = []
+            def add_watch(self, path, mask):
+                self.watches.append(path)
+        os.makedirs(os.path.join(self.directory,"sub","deep"))
+        fake = types.SimpleNamespace(flags=flags,INotify=INotify)
+        with mock.patch("watch.inotify_simple",fake):
+            watcher = Watcher(Compiler(self.directory,workers=1,recursive=True))
+            notifier = watcher.open_notifier_()
+            self.assertEqual(len(notifier.watches),3)
+            os.makedirs(os.path.join(self.directory,"sub","new"))
+            shutil.rmtree(os.path.join(self.directory,"sub","deep"))
+            watcher.add_watches_(notifier)
+            self.assertEqual(notifier.watches[-1],os.path.join(self.directory,"sub","new"))
+            self.assertEqual(len(watcher.watched_),3)
+            flat = Watcher(Compiler(self.directory,workers=1)).open_notifier_()
+            self.assertEqual(flat.watches,[self.directory])
+            # Links back to an ancestor are watched once, not followed forever
+            os.symlink(self.directory,os.path.join(self.directory,"sub","up"))
+            os.symlink(os.path.join(self.directory,"sub"),os.path.join(self.directory,"sub","new","up2"))
+            looped = Watcher(Compiler(self.directory,workers=1,recursive=True)).open_notifier_()
+            self.assertEqual(len(looped.watches),3)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,186 @@
+from __future__ import annotations
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from parser import Compiler, FileManager, Parser, Tokeniser, count_nodes
+
+NATIVE = ['int','float','double','char','str','bool']
+CONTAINERS = ['array','set','map']
+
+def generic_type(depth:int, leaf:str, rng:random.Random)->str:
+    """
+    @return A var_type nesting depth containers around leaf, e.g. array<map<str,Point>>
+    """
+    output = leaf 
+    for _ in range(depth):
+        container = rng.choice(CONTAINERS)
+        if container == 'map':
+            output = f"map<{rng.choice(NATIVE)},{output}>"
+        else:
+            output = f"{container}<{output}>"
+    return output 
+
+def generate_source(prefix:str, classes:int, members:int, inheritance_depth:int, 
+                    generic_depth:int, rng:random.Random)->str:
+    """
+    Generate one ODL source with classes declarations. Classes form
+    inheritance chains inheritance_depth long, each subclass overriding
+    the methods of its superclass.
+    """
+    lines = [f"local {prefix}group = {prefix}C0;"] if classes > 0 else []
+    # Parameters of each method of the chain, which overrides must repeat
+    signatures = {}
+    for index in range(classes):
+        name = f"{prefix}C{index}"
+        position = index % (inheritance_depth + 1)
+        superclass = f"{prefix}C{index-1}" if position > 0 else None 
+        lines.append(f"class {name}: {superclass}{{" if superclass else f"class {name}{{")
+        for member in range(members):
+            leaf = rng.choice(NATIVE + [name])
+            var_type = generic_type(rng.randint(0, generic_depth), leaf, rng)
+            if member % 2 == 0:
+                kind = ('field','static','class_var')[member % 3]
+                lines.append(f"    {kind} {var_type} m{member}, n{member};")
+            else:
+                override = "override " if superclass else ""
+                if not superclass:
+                    signatures[member] = ", ".join(rng.choice(NATIVE) for _ in range(rng.randint(0, 3)))
+                parameters = signatures[member]
+                lines.append(f"    {override}method {var_type} f{member}({parameters});")
+        lines.append("}")
+    return "\n".join(lines) + "\n"
+
+def generate_corpus(directory:str, files:int=10, classes:int=100, members:int=10, 
+                    inheritance_depth:int=3, generic_depth:int=2, seed:int=0)->List[str]:
+    """
+    Write a synthetic .oml corpus of files files with classes classes each
+    @return The paths written
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for index in range(files):
+        path = os.path.join(directory, f"schema_{index}.oml")
+        with open(path, 'w') as file_:
+            file_.write(generate_source(f"F{index}", classes, members, inheritance_depth, generic_depth, rng))
+        paths.append(path)
+    return paths 
+
+def peak_rss()->int|None:
+    """
+    @return Peak resident set size of this process in bytes, where available
+    """
+    try:
+        import resource
+    except ImportError:
+        return None 
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def best_time(function:Callable, repeat:int)->float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best 
+
+def run_benchmarks(directory:str, repeat:int=3, workers:int|None=None)->Dict[str,dict]:
+    """
+    Time tokenising, parsing and whole directory compilation of a corpus
+    @return Metrics for each benchmark, keyed by benchmark name
+    """
+    files = FileManager(directory).files
+    tokens = {path:Tokeniser(path,"scan").get_tokens() for path in files}
+    token_count = sum(len(t) for t in tokens.values())
+    node_count = sum(count_nodes(Parser(t).compile_program()) for t in tokens.values())
+    results = {}
+    
+    def record(name:str, seconds:float, **rates)->None:
+        results[name] = {"seconds":seconds}
+        for key, count in rates.items():
+            results[name][key] = count / seconds if seconds > 0 else None 
+            
+    for mode in Tokeniser.modes:
+        seconds = best_time(lambda: [Tokeniser(path,mode).get_tokens() for path in files], repeat)
+        record(f"tokenise_{mode}", seconds, tokens_per_second=token_count)
+    for predictive in (False, True):
+        name = "parse_predictive" if predictive else "parse_backtracking"
+        seconds = best_time(lambda: [Parser(t,predictive).compile_program() for t in tokens.values()], repeat)
+        record(name, seconds, tokens_per_second=token_count, nodes_per_second=node_count)
+    seconds = best_time(lambda: Compiler(directory, workers).compile_all(), repeat)
+    record("compile_all", seconds, tokens_per_second=token_count, nodes_per_second=node_count)
+    results["corpus"] = {"files":len(files), "tokens":token_count, "nodes":node_count, 
+                         "peak_rss":peak_rss()}
+    return results 
+
+def compare(results:Dict[str,dict], baseline:Dict[str,dict], tolerance:float=0.2)->List[str]:
+    """
+    @return A message for each benchmark more than tolerance slower than baseline
+    """
+    regressions = []
+    for name, metrics in results.items():
+        if name == "corpus" or name not in baseline:
+            continue 
+        before = baseline[name]["seconds"]
+        after = metrics["seconds"]
+        if before > 0 and after > before * (1 + tolerance):
+            regressions.append(f"{name}: {after:.4f}s vs baseline {before:.4f}s (+{after/before-1:.0%})")
+    return regressions 
+
+def report(results:Dict[str,dict])->str:
+    corpus = results["corpus"]
+    lines = [f"corpus: {corpus['files']} files, {corpus['tokens']} tokens, {corpus['nodes']} nodes"]
+    for name, metrics in results.items():
+        if name == "corpus":
+            continue 
+        rates = ", ".join(f"{key}={value:,.0f}" for key, value in metrics.items() 
+                          if key != "seconds" and value is not None)
+        lines.append(f"{name:20} {metrics['seconds']:.4f}s  {rates}")
+    if corpus["peak_rss"] is not None:
+        lines.append(f"peak RSS: {corpus['peak_rss']/2**20:.1f} MiB")
+    return "\n".join(lines)
+
+def main(argv:List[str]|None=None)->int:
+    parser = argparse.ArgumentParser(description="Benchmark the ODL tokeniser, parser and compiler")
+    parser.add_argument("--corpus", help="existing corpus directory; a synthetic one is generated otherwise")
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--classes", type=int, default=100, help="classes per file")
+    parser.add_argument("--members", type=int, default=10, help="members per class")
+    parser.add_argument("--inheritance-depth", type=int, default=3)
+    parser.add_argument("--generic-depth", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--save", help="write the results as a JSON baseline")
+    parser.add_argument("--baseline", help="JSON baseline to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before a regression is reported")
+    args = parser.parse_args(argv)
+    
+    with tempfile.TemporaryDirectory() as temp:
+        directory = args.corpus 
+        if directory is None:
+            directory = temp 
+            generate_corpus(directory, args.files, args.classes, args.members, 
+                            args.inheritance_depth, args.generic_depth, args.seed)
+        results = run_benchmarks(directory, args.repeat, args.workers)
+    print(report(results))
+    if args.save:
+        with open(args.save, 'w') as file_:
+            json.dump(results, file_, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file_:
+            regressions = compare(results, json.load(file_), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0 
+    return 0 
+
+if __name__ == "__main__":
+    sys.exit(main())
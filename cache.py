@@ -0,0 +1,211 @@
+from __future__ import annotations
+import argparse
+import hashlib
+import os
+from typing import List, Tuple
+
+from parser import GRAMMAR_FILE, ParserError, __version__, compile_source_, decode_source_, unreadable_tree_
+from serializer import FormatError, dumps, loads_tree
+
+# Default bound of every on-disk cache
+MAX_BYTES = 256*1024*1024
+
+class DirectoryCache:
+    """
+    Directory of cache entries, one file per key, bounded in size. Reading
+    an entry refreshes its mtime, and the least recently used entries are
+    evicted once the directory exceeds max_bytes.
+    """
+    suffix = ".entry"
+    
+    def __init__(self, directory:str, max_bytes:int|None=None):
+        self.directory = directory 
+        self.max_bytes = MAX_BYTES if max_bytes is None else max_bytes 
+        os.makedirs(self.directory, exist_ok=True)
+        self.size_ = sum(size for _, _, size in self.entries())
+        
+    def entry_path(self, key:str)->str:
+        return os.path.join(self.directory, key + self.suffix)
+    
+    def entries(self)->List[Tuple[str,float,int]]:
+        """
+        @return (path, mtime, size) of every cache entry
+        """
+        output = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(self.suffix) and entry.is_file():
+                    stat = entry.stat()
+                    output.append((entry.path, stat.st_mtime, stat.st_size))
+        return output 
+    
+    def read_(self, key:str)->bytes|None:
+        path = self.entry_path(key)
+        try:
+            with open(path, 'rb') as file_:
+                data = file_.read()
+        except FileNotFoundError:
+            return None 
+        os.utime(path)
+        return data 
+    
+    def write_(self, key:str, data:bytes)->None:
+        path = self.entry_path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as file_:
+            file_.write(data)
+        size = len(data)
+        try:
+            # Storing a key again, e.g. on refresh, replaces its entry
+            size -= os.path.getsize(path)
+        except FileNotFoundError:
+            pass 
+        os.replace(temp_path, path)
+        self.size_ += size 
+        if self.size_ > self.max_bytes:
+            self.evict()
+            
+    def evict(self)->int:
+        """
+        Remove least recently used entries until the cache fits in max_bytes
+        @return Number of entries removed
+        """
+        entries = sorted(self.entries(), key=lambda entry: entry[1])
+        self.size_ = sum(size for _, _, size in entries)
+        removed = 0 
+        for path, _, size in entries:
+            if self.size_ <= self.max_bytes:
+                break 
+            self.remove_(path, size)
+            removed += 1 
+        return removed 
+    
+    def clear(self)->int:
+        entries = self.entries()
+        for path, _, size in entries:
+            self.remove_(path, size)
+        return len(entries)
+    
+    def remove_(self, path:str, size:int)->None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return 
+        self.size_ -= size 
+
+class ASTCache(DirectoryCache):
+    """
+    On-disk cache of parsed programs keyed by the SHA-256 of a file's content,
+    the grammar and the tool version. Entries are CompactTrees in the
+    serializer's binary format, one file per key, evicted least recently
+    used first once the cache exceeds max_bytes.
+    """
+    suffix = ".ast"
+    # Bumped whenever the layout of cached trees changes
+    format_version = 3
+    
+    def __init__(self, directory:str, max_bytes:int|None=None):
+        super().__init__(directory, max_bytes)
+        self.version_ = None 
+        
+    @property
+    def version(self)->bytes:
+        """
+        Digest of the grammar and tool version, mixed into every key so that
+        changing either invalidates the whole cache
+        """
+        if self.version_ is None:
+            digest = hashlib.sha256(f"{__version__}/{self.format_version}".encode())
+            with open(GRAMMAR_FILE, 'rb') as file_:
+                digest.update(file_.read())
+            self.version_ = digest.digest()
+        return self.version_
+    
+    def key(self, content:bytes)->str:
+        return hashlib.sha256(self.version + content).hexdigest()
+    
+    def get(self, key:str):
+        data = self.read_(key)
+        if data is None:
+            return None 
+        try:
+            return loads_tree(data)
+        except FormatError:
+            return None 
+    
+    def put(self, key:str, tree)->None:
+        self.write_(key, dumps(tree))
+            
+    def lookup(self, path:str)->tuple:
+        """
+        @return The cache key for the current content of path and the cached
+        tree, or None if there is no entry for it
+        """
+        with open(path, 'rb') as file_:
+            key = self.key(file_.read())
+        return key, self.get(key)
+    
+    def compile_file(self, path:str):
+        """
+        Load the parse tree of path from the cache, parsing and storing it on a miss
+        """
+        with open(path, 'rb') as file_:
+            content = file_.read()
+        key = self.key(content)
+        tree = self.get(key)
+        if tree is None:
+            try:
+                source = decode_source_(content)
+            except UnicodeDecodeError as error:
+                tree = unreadable_tree_(ParserError(f"Cannot read {path}: {error}"))
+            else:
+                tree = compile_source_(source)
+            self.put(key, tree)
+        return tree 
+    
+    def invalidate(self, path:str)->bool:
+        """
+        Drop the entry for the current content of path
+        @return True if an entry was removed
+        """
+        key, _ = self.lookup(path)
+        entry = self.entry_path(key)
+        if not os.path.isfile(entry):
+            return False 
+        self.remove_(entry, os.path.getsize(entry))
+        return True
+
+class SourceCache(DirectoryCache):
+    """
+    On-disk cache of generated Python source, keyed by the caller
+    """
+    suffix = ".py"
+    
+    def get(self, key:str)->str|None:
+        data = self.read_(key)
+        return None if data is None else data.decode('utf-8')
+    
+    def put(self, key:str, source:str)->None:
+        self.write_(key, source.encode('utf-8'))
+
+def main(argv:List[str]|None=None)->None:
+    parser = argparse.ArgumentParser(description="Manage the ODL parse tree cache")
+    parser.add_argument("directory", help="cache directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("clear", help="remove every entry")
+    commands.add_parser("evict", help="evict entries until the cache fits in --max-bytes")
+    invalidate = commands.add_parser("invalidate", help="remove the entries for the given files")
+    invalidate.add_argument("files", nargs="+")
+    parser.add_argument("--max-bytes", type=int, default=MAX_BYTES)
+    args = parser.parse_args(argv)
+    cache = ASTCache(args.directory, args.max_bytes)
+    if args.command == "clear":
+        print(f"Removed {cache.clear()} entries")
+    elif args.command == "evict":
+        print(f"Removed {cache.evict()} entries")
+    else:
+        removed = sum(cache.invalidate(file) for file in args.files)
+        print(f"Removed {removed} entries")
+
+if __name__ == "__main__":
+    main()
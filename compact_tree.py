@@ -0,0 +1,136 @@
+from __future__ import annotations
+from array import array
+from typing import List
+
+from parser import KIND_NODE, KINDS, Token
+
+class CompactTree:
+    """
+    Flat struct-of-arrays representation of a parse tree. Nodes are stored in
+    pre-order; node types and values are codes into shared string tables and
+    the tree shape is held as parent/first-child/next-sibling indices, -1
+    marking an absent link. Source positions are one based, 0 marking an
+    unknown position. The whole tree is a handful of arrays regardless of
+    its size, which keeps it small in memory and cheap to pickle.
+    
+    errors holds the diagnostics reported while the tree was parsed.
+    """
+    def __init__(self):
+        self.errors = []
+        self.types = []
+        self.values = []
+        self.type_codes = array('B')
+        self.value_codes = array('I')
+        self.parent = array('i')
+        self.first_child = array('i')
+        self.next_sibling = array('i')
+        self.lines = array('I')
+        self.columns = array('I')
+        
+    def __len__(self)->int:
+        return len(self.type_codes)
+    
+    @classmethod
+    def from_token(cls, root:Token, errors:list|None=None)->CompactTree:
+        tree = cls()
+        tree.errors = list(errors) if errors is not None else []
+        type_index = {}
+        value_index = {}
+        last_child = []
+        stack = [(root,-1)]
+        while stack:
+            token, parent = stack.pop()
+            index = len(tree.type_codes)
+            if token.token_type not in type_index:
+                type_index[token.token_type] = len(tree.types)
+                tree.types.append(token.token_type)
+            if token.token_value not in value_index:
+                value_index[token.token_value] = len(tree.values)
+                tree.values.append(token.token_value)
+            tree.type_codes.append(type_index[token.token_type])
+            tree.value_codes.append(value_index[token.token_value])
+            tree.parent.append(parent)
+            tree.first_child.append(-1)
+            tree.next_sibling.append(-1)
+            tree.lines.append(token.line or 0)
+            tree.columns.append(token.column or 0)
+            last_child.append(-1)
+            if parent != -1:
+                if last_child[parent] == -1:
+                    tree.first_child[parent] = index
+                else:
+                    tree.next_sibling[last_child[parent]] = index
+                last_child[parent] = index
+            for child in reversed(token.token_children):
+                stack.append((child,index))
+        return tree
+    
+    def children(self, index:int)->List[int]:
+        output = []
+        child = self.first_child[index]
+        while child != -1:
+            output.append(child)
+            child = self.next_sibling[child]
+        return output
+    
+    def node(self, index:int=0)->CompactNode:
+        return CompactNode(self,index)
+    
+    def to_token(self, index:int=0)->Token:
+        """
+        Rebuild a Token tree from the subtree rooted at index
+        """
+        root = self.make_token_(index)
+        stack = [(index,root)]
+        while stack:
+            index, token = stack.pop()
+            for child in self.children(index):
+                child_token = self.make_token_(child)
+                token.add(child_token)
+                stack.append((child,child_token))
+        return root
+    
+    def make_token_(self, index:int)->Token:
+        return Token(self.types[self.type_codes[index]],self.values[self.value_codes[index]],
+                     self.lines[index] or None,self.columns[index] or None)
+
+class CompactNode:
+    """
+    Read only view of one node of a CompactTree exposing the Token API
+    """
+    __slots__ = ("tree","index")
+    
+    def __init__(self, tree:CompactTree, index:int):
+        self.tree = tree 
+        self.index = index 
+        
+    @property
+    def token_type(self)->str:
+        return self.tree.types[self.tree.type_codes[self.index]]
+    
+    @property
+    def token_value(self)->str:
+        return self.tree.values[self.tree.value_codes[self.index]]
+    
+    @property
+    def kind(self)->int:
+        return KINDS.get(self.token_type, KIND_NODE)
+    
+    @property
+    def line(self)->int|None:
+        return self.tree.lines[self.index] or None 
+    
+    @property
+    def column(self)->int|None:
+        return self.tree.columns[self.index] or None 
+    
+    @property
+    def token_children(self)->List[CompactNode]:
+        return [CompactNode(self.tree,child) for child in self.tree.children(self.index)]
+    
+    def to_token(self)->Token:
+        return self.tree.to_token(self.index)
+    
+    __str__ = Token.__str__
+    __repr__ = Token.__repr__
+    __eq__ = Token.__eq__
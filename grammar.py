@@ -0,0 +1,155 @@
+from __future__ import annotations
+import re
+from typing import Dict, FrozenSet, List, Tuple
+
+class GrammarError(Exception):
+    pass
+
+class Grammar:
+    """
+    Reader for the EBNF-style rules in grammar.txt, used to derive FIRST sets
+    and LL(1) prediction tables for the parser.
+    
+    Each rule body is held as a nested tuple expression:
+    ('alt', [seq...]), ('seq', [item...]), ('rep', item, op), ('lit', text)
+    and ('ref', name).
+    """
+    lexeme = re.compile(r"\s*(?:('[^']*'(?:\s*-\s*'[^']*')?)|(\w+)|([|()*?+]))")
+    
+    def __init__(self, rules:Dict[str,tuple]):
+        self.rules = rules 
+        self.first_ = {}
+        
+    @classmethod
+    def from_file(cls, path:str)->Grammar:
+        with open(path, 'r') as file_:
+            return cls.from_text(file_.read())
+    
+    @classmethod
+    def from_text(cls, text:str)->Grammar:
+        rules = {}
+        for line in text.splitlines():
+            line = line.strip()
+            if len(line)==0 or line.startswith("//"):
+                continue 
+            name, sep, body = line.partition(":")
+            if sep == "":
+                raise GrammarError(f"Expected rule definition, Actual: {line}")
+            rules[name.strip()] = cls.parse_body(body)
+        return cls(rules)
+    
+    @classmethod
+    def lex_body(cls, body:str)->List[Tuple[str,str]]:
+        lexemes = []
+        position = 0
+        body = body.rstrip()
+        while position < len(body):
+            match = cls.lexeme.match(body, position)
+            if match is None:
+                raise GrammarError(f"Unidentifiable grammar symbol: {body[position:]}")
+            literal, name, operator = match.groups()
+            if literal is not None:
+                lexemes.append(("lit",literal.replace(" ","")))
+            elif name is not None:
+                lexemes.append(("ref",name))
+            else:
+                lexemes.append(("op",operator))
+            position = match.end()
+        return lexemes
+    
+    @classmethod
+    def parse_body(cls, body:str)->tuple:
+        lexemes = cls.lex_body(body)
+        expr, position = cls.parse_alt_(lexemes, 0)
+        if position != len(lexemes):
+            raise GrammarError(f"Unexpected grammar symbol: {lexemes[position][1]}")
+        return expr 
+    
+    @classmethod
+    def parse_alt_(cls, lexemes:list, position:int)->Tuple[tuple,int]:
+        seqs = []
+        seq, position = cls.parse_seq_(lexemes, position)
+        seqs.append(seq)
+        while position < len(lexemes) and lexemes[position] == ("op","|"):
+            seq, position = cls.parse_seq_(lexemes, position+1)
+            seqs.append(seq)
+        return ("alt",seqs), position 
+    
+    @classmethod
+    def parse_seq_(cls, lexemes:list, position:int)->Tuple[tuple,int]:
+        items = []
+        while position < len(lexemes) and lexemes[position] not in (("op","|"),("op",")")):
+            kind, text = lexemes[position]
+            if kind == "op" and text == "(":
+                item, position = cls.parse_alt_(lexemes, position+1)
+                if position >= len(lexemes) or lexemes[position] != ("op",")"):
+                    raise GrammarError("Expected symbol: )")
+                position += 1
+            elif kind == "op":
+                raise GrammarError(f"Unexpected grammar symbol: {text}")
+            elif kind == "lit":
+                item = ("lit",text.strip("'") if "-" not in text else text)
+                position += 1
+            else:
+                item = ("ref",text)
+                position += 1
+            while position < len(lexemes) and lexemes[position] in (("op","*"),("op","?"),("op","+")):
+                item = ("rep",item,lexemes[position][1])
+                position += 1
+            items.append(item)
+        return ("seq",items), position 
+    
+    def first(self, name:str)->FrozenSet[str]:
+        """
+        @return The terminals that can begin a sentence derived from rule name
+        """
+        return self.first_of_(("ref",name))[0]
+    
+    def first_of_(self, expr:tuple)->Tuple[FrozenSet[str],bool]:
+        """
+        @return FIRST set of expr and whether expr can derive the empty string
+        """
+        kind = expr[0]
+        if kind == "lit":
+            return frozenset([expr[1]]), False 
+        if kind == "ref":
+            name = expr[1]
+            if name not in self.rules:
+                return frozenset([name]), False 
+            if name not in self.first_:
+                # Guard against left recursion while the rule is being computed
+                self.first_[name] = (frozenset(), False)
+                self.first_[name] = self.first_of_(self.rules[name])
+            return self.first_[name]
+        if kind == "rep":
+            first, nullable = self.first_of_(expr[1])
+            return first, nullable or expr[2] in "*?"
+        if kind == "seq":
+            first = set()
+            for item in expr[1]:
+                item_first, item_nullable = self.first_of_(item)
+                first |= item_first
+                if not item_nullable:
+                    return frozenset(first), False 
+            return frozenset(first), True 
+        first = set()
+        nullable = False 
+        for seq in expr[1]:
+            seq_first, seq_nullable = self.first_of_(seq)
+            first |= seq_first
+            nullable = nullable or seq_nullable
+        return frozenset(first), nullable 
+    
+    def predict(self, alternatives:List[str])->Dict[str,str]:
+        """
+        Build an LL(1) prediction table choosing between several rules
+        @param alternatives Names of the competing rules
+        @return Mapping from lookahead terminal to the rule it selects
+        """
+        table = {}
+        for name in alternatives:
+            for terminal in self.first(name):
+                if terminal in table:
+                    raise GrammarError(f"{table[terminal]} and {name} are not LL(1) on {terminal}")
+                table[terminal] = name 
+        return table 
@@ -0,0 +1,166 @@
+from __future__ import annotations
+from typing import List, Tuple
+
+from parser import Parser, ParserError, Token, Tokeniser
+
+class Span:
+    """
+    Lines start..end (inclusive) holding one top level statement, or, when
+    token is None, the tokens skipped after a syntax error up to the line
+    where parsing resumed
+    """
+    __slots__ = ("start","end","token","errors")
+    
+    def __init__(self, start:int, end:int, token:Token|None, errors:List[ParserError]=()):
+        self.start = start 
+        self.end = end 
+        self.token = token 
+        # Syntax errors reported on these lines, including those recovered from inside the statement
+        self.errors = list(errors)
+
+class IncrementalParser:
+    """
+    Keeps a document, its tokens per line and its top level statements with
+    their line spans, so that an edit only re-tokenises the edited lines and
+    only re-parses the statements those lines touch. All other statement
+    subtrees are reused as they are.
+    
+    A statement that fails to parse is reported in errors and skipped up to
+    the next class or local, as Parser does with recover=True, so the
+    statements after it are still parsed.
+    """
+    def __init__(self, text:str):
+        self.lines = text.split("\n")
+        self.line_tokens = []
+        self.line_errors = []
+        for index, line in enumerate(self.lines):
+            tokens, error = self.tokenise_line_(line, index)
+            self.line_tokens.append(tokens)
+            self.line_errors.append(error)
+        self.spans, _ = self.parse_lines_(0, len(self.lines)-1)
+        self.last_region = (0, len(self.lines)-1)
+        
+    @staticmethod
+    def tokenise_line_(line:str, index:int)->Tuple[List[Token],ParserError|None]:
+        try:
+            return Tokeniser.scan(line, index+1), None 
+        except ParserError as error:
+            return [], error 
+        
+    @property
+    def text(self)->str:
+        return "\n".join(self.lines)
+    
+    @property
+    def program(self)->Token:
+        root = Token("program")
+        for span in self.spans:
+            if span.token is not None:
+                root.add(span.token)
+        return root 
+    
+    @property
+    def errors(self)->List[ParserError]:
+        errors = [error for error in self.line_errors if error is not None]
+        for span in self.spans:
+            errors.extend(span.errors)
+        return errors 
+    
+    def edit(self, start_line:int, start_column:int, end_line:int, end_column:int, text:str)->Token:
+        """
+        Replace the text between two positions and update the parse tree
+        @param start_line, start_column First replaced character, zero based
+        @param end_line, end_column Position just after the last replaced character
+        @param text Replacement text, which may span several lines
+        @return The updated program
+        """
+        prefix = self.lines[start_line][:start_column]
+        suffix = self.lines[end_line][end_column:]
+        new_lines = (prefix + text + suffix).split("\n")
+        delta = len(new_lines) - (end_line - start_line + 1)
+        tokenised = [self.tokenise_line_(line, start_line+offset) for offset, line in enumerate(new_lines)]
+        self.lines[start_line:end_line+1] = new_lines
+        self.line_tokens[start_line:end_line+1] = [tokens for tokens, _ in tokenised]
+        self.line_errors[start_line:end_line+1] = [error for _, error in tokenised]
+        
+        if delta != 0:
+            self.shift_positions_(start_line + len(new_lines), delta)
+        
+        before, affected, after = [], [], []
+        for span in self.spans:
+            if span.end < start_line:
+                before.append(span)
+            elif span.start > end_line:
+                span.start += delta 
+                span.end += delta 
+                after.append(span)
+            else:
+                affected.append(span)
+        region_start = min([start_line] + [span.start for span in affected])
+        region_end = max([start_line + len(new_lines) - 1] + [span.end + delta for span in affected])
+        
+        # A region that does not parse on its own, e.g. because the edit
+        # removed a closing brace, absorbs the following statements one by one
+        while True:
+            # Statements sharing a line with the region are parsed with it
+            while before and before[-1].end >= region_start:
+                region_start = min(region_start, before.pop().start)
+            while after and after[0].start <= region_end:
+                region_end = max(region_end, after.pop(0).end)
+            spans, complete = self.parse_lines_(region_start, region_end)
+            if complete or len(after) == 0:
+                break 
+            region_end = after.pop(0).end 
+        self.spans = before + spans + after 
+        self.last_region = (region_start, region_end)
+        return self.program 
+    
+    def shift_positions_(self, first_line:int, delta:int)->None:
+        """
+        Move the source positions of the reused tokens and errors on and
+        after first_line by delta lines
+        """
+        for tokens in self.line_tokens[first_line:]:
+            for token in tokens:
+                token.line += delta 
+        for error in self.line_errors[first_line:]:
+            if error is not None:
+                error.line += delta 
+        for span in self.spans:
+            for error in span.errors:
+                if error.line is not None and error.line > first_line - delta:
+                    error.line += delta 
+                
+    def parse_lines_(self, start:int, end:int)->Tuple[List[Span],bool]:
+        """
+        Parse the statements on lines start..end, skipping a statement that
+        fails up to the next class or local
+        @return The statement spans and whether parsing reached the end of
+        the region without an error cutting off its last statement
+        """
+        tokens = []
+        token_lines = []
+        for line in range(start, end+1):
+            tokens.extend(self.line_tokens[line])
+            token_lines.extend([line]*len(self.line_tokens[line]))
+        parser = Parser(tokens, predictive=True, recover=True)
+        spans = []
+        while parser.c_index < len(tokens):
+            begin = parser.c_index
+            reported = len(parser.errors)
+            scope = "local_var_dec_stmt" if parser.current_value == 'local' else "class_dec_stmt"
+            try:
+                production = parser.predict_("program")
+                if production is None:
+                    raise ParserError.at(f"Expect keyword: class or local, Actual: {parser.current_value}",
+                                         parser.current_token)
+                stmt = production()
+            except ParserError as error:
+                if not parser.recover_(error, begin, scope) or parser.c_index >= len(tokens):
+                    spans.append(Span(token_lines[begin], end, None, parser.errors[reported:]))
+                    return spans, False 
+                # The skipped tokens run up to the line parsing resumes on
+                spans.append(Span(token_lines[begin], token_lines[parser.c_index], None, parser.errors[reported:]))
+                continue 
+            spans.append(Span(token_lines[begin], token_lines[parser.c_index-1], stmt, parser.errors[reported:]))
+        return spans, True 
@@ -0,0 +1,207 @@
+from __future__ import annotations
+import json
+import time
+from typing import Callable, Iterator, List
+
+from parser import FileManager, Parser, ParserError, Token, Tokeniser, count_nodes
+
+class Metrics:
+    """
+    Timings and counts collected from tokenisers, parsers and file managers.
+
+    attach wraps the methods of a single instance, so objects that were
+    never attached run the plain class methods and pay nothing. Per file it
+    records tokenise and parse time, token, node and error counts and
+    backtracks, a backtrack being a ParserError raised by one production
+    and caught by the parser, which then tries something else. Per
+    production it records hits, inclusive time, failures and backtracks.
+
+    callback, if given, is called as callback(event, data) for every
+    tokenise, parse, backtrack and discovery event.
+    """
+    def __init__(self, callback:Callable[[str,dict],None]|None=None):
+        self.callback = callback
+        self.files = {}
+        self.productions = {}
+        self.discovery = {"runs":0, "files":0, "seconds":0.0}
+
+    def file(self, path:str|None)->dict:
+        """
+        @return The mutable statistics of path, created on first use
+        """
+        stats = self.files.get(path)
+        if stats is None:
+            stats = self.files[path] = {"tokens":0, "nodes":0, "errors":0, "backtracks":0, "cache_hits":0,
+                                        "tokenise_seconds":0.0, "parse_seconds":0.0}
+        return stats
+
+    def production(self, name:str)->dict:
+        stats = self.productions.get(name)
+        if stats is None:
+            stats = self.productions[name] = {"hits":0, "failures":0, "backtracks":0, "seconds":0.0}
+        return stats
+
+    def emit_(self, event:str, **data)->None:
+        if self.callback is not None:
+            self.callback(event, data)
+
+    def record_tokenise(self, path:str|None, tokens:int, seconds:float)->None:
+        stats = self.file(path)
+        stats["tokens"] += tokens
+        stats["tokenise_seconds"] += seconds
+        self.emit_("tokenise", path=path, tokens=tokens, seconds=seconds)
+
+    def record_parse(self, path:str|None, program:Token, errors:int, seconds:float)->None:
+        stats = self.file(path)
+        nodes = count_nodes(program)
+        stats["nodes"] += nodes
+        stats["errors"] += errors
+        stats["parse_seconds"] += seconds
+        self.emit_("parse", path=path, nodes=nodes, errors=errors, seconds=seconds)
+
+    def attach(self, target, path:str|None=None):
+        """
+        Instrument a Tokeniser, Parser or FileManager
+        @param path File the statistics of a parser are recorded under;
+        a tokeniser uses its own file
+        @return target
+        """
+        if isinstance(target, Tokeniser):
+            self.attach_tokeniser_(target)
+        elif isinstance(target, Parser):
+            self.attach_parser_(target, path)
+        elif isinstance(target, FileManager):
+            self.attach_file_manager_(target)
+        else:
+            raise TypeError(f"Cannot instrument {type(target).__name__}")
+        return target
+
+    def detach(self, target)->None:
+        """
+        Restore the plain class methods of an attached object
+        """
+        for name, value in list(vars(target).items()):
+            if getattr(value, "metrics_", None) is self:
+                delattr(target, name)
+
+    def wrap_(self, target, name:str, wrapper:Callable)->None:
+        wrapper.metrics_ = self
+        setattr(target, name, wrapper)
+
+    def attach_tokeniser_(self, tokeniser:Tokeniser)->None:
+        get_tokens = tokeniser.get_tokens
+        def wrapper():
+            start = time.perf_counter()
+            tokens = get_tokens()
+            self.record_tokenise(tokeniser.file, len(tokens or ()), time.perf_counter()-start)
+            return tokens
+        self.wrap_(tokeniser, "get_tokens", wrapper)
+
+    def attach_parser_(self, parser:Parser, path:str|None)->None:
+        # The last ParserError raised by a production and not yet seen to be
+        # caught, and the production that raised it
+        pending = [None, None]
+
+        def caught():
+            error, name = pending
+            pending[0] = None
+            if any(error is recorded for recorded in parser.errors):
+                # Reported by error recovery rather than backtracked over
+                return
+            self.production(name)["backtracks"] += 1
+            self.file(path)["backtracks"] += 1
+            self.emit_("backtrack", path=path, production=name, message=error.message,
+                       line=error.line, column=error.column)
+
+        def wrap(name:str, method:Callable)->Callable:
+            stats = self.production(name)
+            def wrapper(*args, **kwargs):
+                if pending[0] is not None:
+                    caught()
+                stats["hits"] += 1
+                start = time.perf_counter()
+                try:
+                    result = method(*args, **kwargs)
+                except ParserError as error:
+                    stats["seconds"] += time.perf_counter()-start
+                    if error is not pending[0]:
+                        stats["failures"] += 1
+                        pending[0], pending[1] = error, name
+                    raise
+                seconds = time.perf_counter()-start
+                stats["seconds"] += seconds
+                if pending[0] is not None:
+                    caught()
+                if name == "compile_program":
+                    self.record_parse(path, result, len(parser.errors), seconds)
+                return result
+            return wrapper
+
+        for name in dir(type(parser)):
+            if name.startswith("compile_"):
+                self.wrap_(parser, name, wrap(name, getattr(parser, name)))
+
+    def attach_file_manager_(self, file_manager:FileManager)->None:
+        iter_files = file_manager.iter_files
+        def wrapper(refresh:bool=False)->Iterator[str]:
+            # Only time spent producing paths counts, not time spent by the consumer
+            seconds = 0.0
+            count = 0
+            iterator = iter_files(refresh)
+            while True:
+                start = time.perf_counter()
+                try:
+                    path = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    seconds += time.perf_counter()-start
+                count += 1
+                yield path
+            self.discovery["runs"] += 1
+            self.discovery["files"] += count
+            self.discovery["seconds"] += seconds
+            self.emit_("discovery", path=getattr(file_manager, "path", None), files=count, seconds=seconds)
+        self.wrap_(file_manager, "iter_files", wrapper)
+
+    def merge(self, report:dict)->None:
+        """
+        Add the counts of a report, e.g. one produced in a worker process
+        """
+        for path, stats in report.get("files", {}).items():
+            total = self.file(path)
+            for key, value in stats.items():
+                total[key] = total.get(key, 0) + value
+        for name, stats in report.get("productions", {}).items():
+            total = self.production(name)
+            for key, value in stats.items():
+                total[key] += value
+        for key, value in report.get("discovery", {}).items():
+            self.discovery[key] += value
+
+    def hottest(self, key:str="seconds", n:int=10)->List[str]:
+        """
+        @return Names of the n productions with the largest value of key
+        """
+        return sorted(self.productions, key=lambda name: self.productions[name][key], reverse=True)[:n]
+
+    def report(self)->dict:
+        """
+        @return The collected statistics as plain JSON-serialisable data, with
+        productions ordered by inclusive time
+        """
+        totals = {"files":len(self.files)}
+        for stats in self.files.values():
+            for key, value in stats.items():
+                totals[key] = totals.get(key, 0) + value
+        return {"totals":totals,
+                "files":{path:dict(stats) for path, stats in self.files.items()},
+                "productions":{name:dict(self.productions[name]) for name in self.hottest(n=len(self.productions))},
+                "discovery":dict(self.discovery)}
+
+    def to_json(self, indent:int|None=2)->str:
+        return json.dumps(self.report(), indent=indent)
+
+    def dump(self, path:str)->None:
+        with open(path, 'w') as file_:
+            file_.write(self.to_json())
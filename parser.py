@@ -1,7 +1,17 @@
 from __future__ import annotations
+import time
+import_started_ = time.perf_counter()
+import fnmatch
+import io
 import os 
-from typing import List
+import sys
+from typing import Iterable, Iterator, List, TextIO, Tuple
+from collections import deque
 import re
+# hashlib, keyword, argparse and concurrent.futures are imported where they
+# are used: most runs never need them and they dominate the import time
+
+__version__ = "0.1.0"
 
 KEYWORD = ['class','local',
            'int','float','double','char','str','bool','duck','void',
@@ -15,14 +25,74 @@ SYMBOL = ['<','>','(',')','{', '}', ',', ';', ':', '.','=']
 NATIVE_TYPE = ['int','float','double','char','str','bool','duck','void',
                'array','set','map']
 
+# Constant time lookups over the vocabulary; the lists above keep their order
+KEYWORDS = frozenset(KEYWORD)
+SYMBOLS = frozenset(SYMBOL)
+NATIVE_TYPES = frozenset(NATIVE_TYPE)
+MEMBER_KEYWORDS = frozenset(('field','static','class_var'))
+METHOD_KEYWORDS = frozenset(('constructor','method','static_method','class_method'))
+
+# Small int kind of a token, stored on every Token so the parser dispatches
+# without comparing type strings. Tree nodes have KIND_NODE.
+KIND_NODE = 0
+KIND_KEYWORD = 1
+KIND_IDENTIFIER = 2
+KIND_SYMBOL = 3
+KINDS = {'keyword':KIND_KEYWORD, 'identifier':KIND_IDENTIFIER, 'symbol':KIND_SYMBOL}
+
+# Shape of each native type: a plain type, array or set of one type, or map
+TYPE_SCALAR = 1
+TYPE_SEQUENCE = 2
+TYPE_MAPPING = 3
+TYPE_SHAPES = {name:TYPE_SCALAR for name in NATIVE_TYPE}
+TYPE_SHAPES.update({'array':TYPE_SEQUENCE, 'set':TYPE_SEQUENCE, 'map':TYPE_MAPPING})
+
+GRAMMAR_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),"grammar.txt")
+
+EXAMPLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),"Point_Example.odl")
+
+# Grammar rule -> Parser production, for each choice point of the grammar
+PROGRAM_PRODUCTIONS = {'local_var_dec_stmt':'compile_local_var_dec_stmt',
+                       'class_dec_stmt':'compile_class_dec_stmt'}
+
+CLASS_BODY_PRODUCTIONS = {'class_var_dec':'compile_class_var_dec_stmt',
+                          'method_dec':'compile_class_method_dec_stmt'}
+
 class FileManager:
-    def __init__(self, path:str|None=None):
+    def __init__(self, path:str|None=None, recursive:bool=False, include:Iterable[str]=("*.oml",), 
+                 exclude:Iterable[str]=(), follow_symlinks:bool=True):
+        self.recursive = recursive 
+        self.include = tuple(include)
+        self.exclude = tuple(exclude)
+        self.follow_symlinks = follow_symlinks 
+        self.files_ = None 
         self.verify_path_(path)
         
     def verify_path_(self, path:str) -> None:
         if path is not None:
             self.path = path 
-            self.files = self.get_oml_files(self.path)
+            
+    @property
+    def files(self)->List[str]:
+        if self.files_ is None:
+            self.files_ = list(self.iter_files())
+        return self.files_
+    
+    def iter_files(self, refresh:bool=False)->Iterator[str]:
+        """
+        Lazily discover the files under self.path, remembering them in files
+        once the walk completes
+        @param refresh Walk the directory again even if files is known
+        """
+        if self.files_ is not None and not refresh:
+            yield from self.files_
+            return 
+        files = []
+        for path in self.iter_oml_files(self.path, self.recursive, self.include, 
+                                        self.exclude, self.follow_symlinks):
+            files.append(path)
+            yield path 
+        self.files_ = files 
     
     @staticmethod 
     def is_oml_file(path:str) -> bool:
@@ -37,102 +107,908 @@ class FileManager:
     
     @classmethod 
     def get_oml_files(cls, path:str)->List[str]:
-        oml_files = []
+        return list(cls.iter_oml_files(path))
+    
+    @staticmethod
+    def matches_(patterns:Tuple[str,...], name:str, relative_path:str)->bool:
+        return any(fnmatch.fnmatchcase(name, pattern) or fnmatch.fnmatchcase(relative_path, pattern) 
+                   for pattern in patterns)
+    
+    @classmethod
+    def iter_oml_files(cls, path:str, recursive:bool=False, include:Iterable[str]=("*.oml",), 
+                       exclude:Iterable[str]=(), follow_symlinks:bool=True)->Iterator[str]:
+        """
+        Generate matching files under path, walking directories with
+        os.scandir so file types come from the directory listing rather than
+        a stat call per entry
+        @param recursive Descend into subdirectories
+        @param include Glob patterns a file name or its path relative to path
+        must match
+        @param exclude Glob patterns excluding files and whole directories
+        @param follow_symlinks Follow symbolic links to files and directories;
+        a directory reached twice, e.g. through a link loop, is walked once
+        """
+        include = tuple(include)
+        exclude = tuple(exclude)
         if os.path.isfile(path):
-            cls.validate_and_append_(path, oml_files)
-        if os.path.isdir(path):
-            for file in os.listdir(path):
-                cls.validate_and_append_(os.path.join(path,file), oml_files)
-        return oml_files
+            name = os.path.basename(path)
+            if cls.matches_(include, name, name) and not cls.matches_(exclude, name, name):
+                yield path 
+            return 
+        if not os.path.isdir(path):
+            return 
+        for _, files in cls.walk_(path, recursive, exclude, follow_symlinks):
+            for entry, relative_path in files:
+                if cls.matches_(include, entry.name, relative_path):
+                    yield entry.path 
+                    
+    @classmethod
+    def walk_(cls, path:str, recursive:bool=True, exclude:Iterable[str]=(), 
+              follow_symlinks:bool=True)->Iterator[Tuple[str,list]]:
+        """
+        Generate each directory under path, path included, with the not
+        excluded files it holds as (os.DirEntry, path relative to path) pairs.
+        A directory reached twice, e.g. through a link loop, is walked once.
+        """
+        exclude = tuple(exclude)
+        stat = os.stat(path)
+        visited = {(stat.st_dev, stat.st_ino)}
+        pending = [(path, "")]
+        while pending:
+            directory, relative = pending.pop()
+            try:
+                with os.scandir(directory) as it:
+                    entries = sorted(it, key=lambda entry: entry.name)
+            except OSError:
+                continue 
+            files = []
+            subdirectories = []
+            for entry in entries:
+                relative_path = relative + entry.name 
+                if exclude and cls.matches_(exclude, entry.name, relative_path):
+                    continue 
+                try:
+                    if entry.is_file(follow_symlinks=follow_symlinks):
+                        files.append((entry, relative_path))
+                    elif recursive and entry.is_dir(follow_symlinks=follow_symlinks):
+                        stat = entry.stat(follow_symlinks=follow_symlinks)
+                        if (stat.st_dev, stat.st_ino) not in visited:
+                            visited.add((stat.st_dev, stat.st_ino))
+                            subdirectories.append((entry.path, relative_path + "/"))
+                except OSError:
+                    continue 
+            yield directory, files 
+            pending.extend(reversed(subdirectories))
+
+# Shared by every leaf token; replaced by a list on the first call to add
+NO_CHILDREN = ()
 
 class Token:
-    def __init__(self,token_type:str,token_value:str=""):
-        self.token_type = token_type 
+    __slots__ = ("token_type","token_value","token_children","hash_","line","column","kind")
+    
+    def __init__(self,token_type:str,token_value:str="",line:int|None=None,column:int|None=None):
+        self.token_type = sys.intern(token_type)
+        self.kind = KINDS.get(token_type, KIND_NODE)
         self.token_value = token_value 
-        self.token_children = []
+        self.token_children = NO_CHILDREN
+        self.hash_ = None 
+        self.line = line 
+        self.column = column 
         
     def add(self, token:Token)->None:
-        self.token_children.append(token)
+        self.hash_ = None 
+        if self.token_children is NO_CHILDREN:
+            self.token_children = [token]
+        else:
+            self.token_children.append(token)
         
     def __str__(self,depth=0)->str:
         """
         Generate a string from self ParseTree
         @return A printable representation of self ParseTree with indentation
         """        
-        # Set indentation
-        indent = ""
-        for i in range(0,depth):
-            indent += "  \u2502 "
-        
-        # Generate output
-        output = ""
-        if(len(self.token_children)>0):
-            # Output if the node has children
-            output += self.token_type + "\n"
-            for child in self.token_children:
-                output += indent + "  \u2514 " + child.__str__(depth+1)
-            
-            output += indent + "\n"
-        else :
-            # Output if the node is a leaf/terminal
-            output += self.token_type + " " + self.token_value + "\n"
+        buffer = io.StringIO()
+        render_tree(self,buffer,depth)
+        return buffer.getvalue()
+    
+    def render(self, writer:TextIO, depth:int=0)->None:
+        """
+        Stream the printable representation of self ParseTree to writer
+        """
+        render_tree(self,writer,depth)
         
-        return output
+    def dump(self, path:str)->None:
+        """
+        Write the printable representation of self ParseTree to a file
+        """
+        with open(path,'w',encoding='utf-8') as file_:
+            render_tree(self,file_)
     
     def __repr__(self)->str:
         return self.__str__()
   
     def __eq__(self, other:Token)->bool:
-        if self.token_type != other.token_type:
-            return False 
-        if self.token_value != other.token_value:
-            return False 
-        if self.token_children != other.token_children:
-            return False 
+        """
+        Structural equality, ignoring source positions. Subtrees that are the
+        same object, e.g. after hash_cons, are not descended into. Cached
+        hashes are not consulted, as they may predate a change to the tree.
+        """
+        if self is other:
+            return True 
+        if not hasattr(other,"token_children"):
+            return NotImplemented
+        stack = [(self,other)]
+        while stack:
+            token, other_token = stack.pop()
+            if token is other_token:
+                continue 
+            if token.token_type != other_token.token_type:
+                return False 
+            if token.token_value != other_token.token_value:
+                return False 
+            if len(token.token_children) != len(other_token.token_children):
+                return False 
+            stack.extend(zip(token.token_children,other_token.token_children))
         return True 
-  
+    
+    def __hash__(self)->int:
+        """
+        Merkle-style structural hash, computed once per subtree and cached.
+        Adding a child resets the cache of that token only, not of its
+        ancestors, so like any mutable key a tree must not change while it
+        is in a set or dict.
+        """
+        if self.hash_ is None:
+            stack = [self]
+            while stack:
+                token = stack[-1]
+                pending = [child for child in token.token_children if child.hash_ is None]
+                if pending:
+                    stack.extend(pending)
+                    continue 
+                stack.pop()
+                token.hash_ = hash((token.token_type,token.token_value,
+                                    tuple(child.hash_ for child in token.token_children)))
+        return self.hash_
+
+def hash_cons(root:Token, table:dict|None=None)->Token:
+    """
+    Share structurally identical subtrees, e.g. every array<Point> var_type,
+    by replacing them in place with one canonical instance. Shared leaves
+    keep the source position of their first occurrence.
+    @param table Canonical subtrees from earlier calls, to share across trees
+    @return The canonical instance of root
+    """
+    table = {} if table is None else table 
+    stack = [(root,False)]
+    while stack:
+        token, expanded = stack.pop()
+        if not expanded:
+            stack.append((token,True))
+            stack.extend((child,False) for child in token.token_children)
+            continue 
+        if len(token.token_children) > 0:
+            token.token_children[:] = [table.setdefault(child,child) for child in token.token_children]
+    return table.setdefault(root,root)
+
+def count_nodes(root:Token)->int:
+    """
+    @return Number of nodes in the tree of root, root included
+    """
+    count = 0 
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        count += 1 
+        stack.extend(node.token_children)
+    return count 
+
+def compile_source_(source:str, metrics=None, path:str|None=None):
+    """
+    Parse source with error recovery
+    @param metrics Optional instrumentation.Metrics recording the work
+    under path
+    @return A CompactTree whose errors hold every diagnostic, ordered by
+    position
+    """
+    from compact_tree import CompactTree
+    errors = []
+    if metrics is None:
+        tokens = Tokeniser.scan(source, errors=errors)
+        parser = Parser(tokens,predictive=True,recover=True)
+    else:
+        start = time.perf_counter()
+        tokens = Tokeniser.scan(source, errors=errors)
+        metrics.record_tokenise(path, len(tokens), time.perf_counter()-start)
+        parser = metrics.attach(Parser(tokens,predictive=True,recover=True), path)
+    program = parser.compile_program()
+    # In file order, errors at end of input last
+    errors = sorted(errors + parser.errors, key=lambda error: (error.line is None, error.line or 0, error.column or 0))
+    return CompactTree.from_token(program, errors)
+
+def decode_source_(content:bytes)->str:
+    """
+    Decode source files as UTF-8 with universal newlines, as open does in
+    text mode, so that every path from bytes to text agrees
+    """
+    return content.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+
+def read_source_(path:str)->Tuple[str|None,ParserError|None]:
+    """
+    @return The text of path, or None and an error saying why it could not
+    be read
+    """
+    try:
+        with open(path, 'rb') as file_:
+            return decode_source_(file_.read()), None 
+    except (OSError, UnicodeDecodeError) as error:
+        return None, ParserError(f"Cannot read {path}: {error}")
+
+def compile_file_(path:str):
+    """
+    Tokenise and parse one file. Runs in pool workers, so the tree is
+    returned as a CompactTree, which pickles far smaller than Token objects.
+    A file that cannot be read gives an empty program with the reason as
+    its only error.
+    """
+    source, error = read_source_(path)
+    if error is not None:
+        return unreadable_tree_(error)
+    return compile_source_(source)
+
+def unreadable_tree_(error:ParserError):
+    from compact_tree import CompactTree
+    return CompactTree.from_token(Token("program",""), [error])
+
+def profile_file_(path:str):
+    """
+    compile_file_ with instrumentation, for pool workers
+    @return The CompactTree and the report of its Metrics
+    """
+    from instrumentation import Metrics
+    metrics = Metrics()
+    source, error = read_source_(path)
+    if error is not None:
+        metrics.file(path)["errors"] += 1
+        return unreadable_tree_(error), metrics.report()
+    tree = compile_source_(source, metrics, path)
+    return tree, metrics.report()
+
+INDENT = "  \u2502 "
+BRANCH = "  \u2514 "
+
+def render_tree(root:Token, writer:TextIO, depth:int=0)->None:
+    """
+    Write the printable representation of a parse tree, iteratively so that
+    deep trees do not hit the recursion limit. Each child is written as
+    indent + branch + child, and a node with children ends with an indent line.
+    @param root Token or any node with the same attributes
+    @param writer Object with a write method, e.g. an open file or io.StringIO
+    @param depth Indentation level of root
+    """
+    write = writer.write
+    indents = [INDENT*level for level in range(depth+1)]
+    stack = [(root,depth)]
+    while stack:
+        item = stack.pop()
+        if isinstance(item,str):
+            write(item)
+            continue 
+        node, level = item
+        children = node.token_children
+        if len(children) > 0:
+            # Output if the node has children
+            write(node.token_type + "\n")
+            if level+1 > len(indents):
+                indents.append(indents[-1] + INDENT)
+            indent = indents[level]
+            stack.append(indent + "\n")
+            prefix = indent + BRANCH
+            for child in reversed(children):
+                stack.append((child,level+1))
+                stack.append(prefix)
+        else :
+            # Output if the node is a leaf/terminal
+            write(node.token_type + " " + node.token_value + "\n")
+
 class Compiler:
-    def __init__(self, path:str):
+    def __init__(self, path:str, workers:int|None=None, cache=None, recursive:bool=False,
+                 include:Iterable[str]=("*.oml",), exclude:Iterable[str]=(), metrics=None):
         self.path = path 
-        self.file_manager = FileManager(self.path)
+        self.workers = workers 
+        self.cache = cache 
+        # Optional instrumentation.Metrics filled in by discovery and by every compilation
+        self.metrics = metrics 
+        self.file_manager = FileManager(self.path, recursive, include, exclude)
+        if metrics is not None:
+            metrics.attach(self.file_manager)
+        self.programs = {} 
         self.class_list = {} 
         self.local_variable_list = {} 
+        self.diagnostics = {}
+        self.symbol_table = None 
+        # path -> names of the classes and locals it declares, and name -> the
+        # paths declaring it, the one whose declaration is in use last
+        self.file_declarations = {}
+        self.declared_in = {}
+        
+    def compile_all(self, workers:int|None=None)->dict:
+        """
+        Compile every file found by the file manager on a process pool and
+        merge their declarations into class_list and local_variable_list.
+        Syntax errors and files that cannot be read do not stop compilation;
+        they are collected per file in diagnostics.
+        @param workers Number of worker processes, defaults to self.workers
+        or the number of CPUs. With one worker files are compiled in process.
+        @return Mapping from file path to its CompactTree program
+        """
+        self.compile_files(self.file_manager.iter_files(), workers)
+        return self.programs
+    
+    def compile_files(self, files:Iterable[str], workers:int|None=None)->dict:
+        """
+        Compile files as compile_all does, replacing any declarations merged
+        from an earlier version of the same files. files may be a generator:
+        each file is submitted as soon as it is produced, so compilation
+        overlaps with discovery.
+        @return Mapping from each of files to its CompactTree program
+        """
+        workers = workers or self.workers or os.cpu_count() or 1
+        compile_ = compile_file_ if self.metrics is None else profile_file_
+        trees = {}
+        keys = {}
+        futures = {}
+        deferred = None 
+        pool = None 
+        paths = []
+        misses = []
+        try:
+            for path in files:
+                paths.append(path)
+                if self.cache is not None:
+                    try:
+                        keys[path], trees[path] = self.cache.lookup(path)
+                    except OSError:
+                        # Compiling reports why the file cannot be read
+                        keys[path] = trees[path] = None 
+                    if trees[path] is not None:
+                        if self.metrics is not None:
+                            self.metrics.file(path)["cache_hits"] += 1
+                        continue 
+                misses.append(path)
+                if workers == 1:
+                    trees[path] = compile_(path)
+                elif deferred is None and pool is None:
+                    # A single miss is compiled in process rather than paying for a pool
+                    deferred = path 
+                else:
+                    if pool is None:
+                        from concurrent.futures import ProcessPoolExecutor
+                        pool = ProcessPoolExecutor(max_workers=workers)
+                        futures[deferred] = pool.submit(compile_, deferred)
+                    futures[path] = pool.submit(compile_, path)
+            if deferred is not None and pool is None:
+                trees[deferred] = compile_(deferred)
+            for path, future in futures.items():
+                trees[path] = future.result()
+            if self.metrics is not None:
+                for path in misses:
+                    trees[path], report = trees[path]
+                    self.metrics.merge(report)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        if self.cache is not None:
+            for path in misses:
+                if keys[path] is not None:
+                    self.cache.put(keys[path], trees[path])
+        for path in paths:
+            self.remove_file(path)
+            self.programs[path] = trees[path]
+            if trees[path].errors:
+                self.diagnostics[path] = trees[path].errors
+            self.merge_program(trees[path].node(), path)
+        return {path:trees[path] for path in paths}
+    
+    def merge_program(self, program:Token, path:str|None=None)->None:
+        classes = []
+        local_names = []
+        for stmt in program.token_children:
+            if stmt.token_type == "class_dec_stmt":
+                name = self.declared_name(stmt)
+                self.class_list[name] = stmt 
+                classes.append(name)
+                if self.symbol_table is not None:
+                    self.symbol_table.add_class(stmt)
+            elif stmt.token_type == "local_var_dec_stmt":
+                name = self.declared_name(stmt)
+                self.local_variable_list[name] = stmt 
+                local_names.append(name)
+                if self.symbol_table is not None:
+                    self.symbol_table.add_local(stmt)
+            else:
+                continue 
+            paths = self.declared_in.setdefault(name, [])
+            if path in paths:
+                paths.remove(path)
+            paths.append(path)
+        if path is not None:
+            self.file_declarations[path] = (classes, local_names)
+            
+    def remove_file(self, path:str)->None:
+        """
+        Drop the program of path and every declaration it still provides.
+        A name also declared by another file falls back to the most recent
+        of those declarations.
+        """
+        self.programs.pop(path, None)
+        self.diagnostics.pop(path, None)
+        classes, local_names = self.file_declarations.pop(path, ((),()))
+        for names, declarations, kind in ((classes, self.class_list, "class_dec_stmt"), 
+                                          (local_names, self.local_variable_list, "local_var_dec_stmt")):
+            for name in set(names):
+                paths = self.declared_in.get(name, [])
+                if path not in paths:
+                    continue 
+                in_use = paths[-1] == path 
+                paths.remove(path)
+                if not in_use:
+                    continue 
+                stmt = None 
+                while paths and stmt is None:
+                    stmt = self.find_declaration_(paths[-1], name, kind)
+                    if stmt is None:
+                        paths.pop()
+                if stmt is None:
+                    del self.declared_in[name]
+                    del declarations[name]
+                else:
+                    declarations[name] = stmt 
+                if self.symbol_table is None:
+                    continue 
+                if declarations is self.class_list:
+                    if stmt is None:
+                        self.symbol_table.remove_class(name)
+                    else:
+                        self.symbol_table.add_class(stmt)
+                elif stmt is None:
+                    self.symbol_table.remove_local(name)
+                else:
+                    self.symbol_table.add_local(stmt)
+                    
+    def find_declaration_(self, path:str|None, name:str, kind:str)->Token|None:
+        """
+        @return The last statement of type kind declaring name in the program of path
+        """
+        program = self.programs.get(path)
+        if program is None:
+            return None 
+        if not isinstance(program, Token):
+            program = program.node()
+        found = None 
+        for stmt in program.token_children:
+            if stmt.token_type == kind and self.declared_name(stmt) == name:
+                found = stmt 
+        return found 
+                    
+    def refresh(self, changed:List[str], removed:List[str]=())->set:
+        """
+        Recompile changed files and drop removed ones, keeping the symbol
+        table up to date
+        @return Names of the classes declared in those files, before or after,
+        together with every class inheriting from them
+        """
+        table = self.symbol_table if self.symbol_table is not None else self.build_symbol_table()
+        touched = set()
+        aliases = set()
+        for path in list(changed) + list(removed):
+            classes, local_names = self.file_declarations.get(path, ((),()))
+            touched.update(classes)
+            aliases.update(local_names)
+        for path in removed:
+            self.remove_file(path)
+        if changed:
+            self.compile_files(list(changed))
+        for path in changed:
+            classes, local_names = self.file_declarations[path]
+            touched.update(classes)
+            aliases.update(local_names)
+        if aliases:
+            touched.update(name for name, symbol in table.classes.items() 
+                           if aliases.intersection(symbol.superclasses))
+        affected = set(touched)
+        for name in touched:
+            affected |= table.descendants(name)
+        return affected 
+    
+    def watch(self, callback=None, interval:float=0.5, stop_event=None)->None:
+        """
+        Compile the directory, then keep recompiling files as they change
+        until stop_event is set. See watch.Watcher.
+        """
+        from watch import Watcher
+        Watcher(self, interval).run(callback, stop_event)
+        
+    def build_symbol_table(self):
+        """
+        Index the merged class and local declarations
+        @return A symbol_table.SymbolTable, also kept as self.symbol_table
+        """
+        from symbol_table import SymbolTable
+        self.symbol_table = SymbolTable()
+        for stmt in self.local_variable_list.values():
+            self.symbol_table.add_local(stmt)
+        for stmt in self.class_list.values():
+            self.symbol_table.add_class(stmt)
+        return self.symbol_table 
+    
+    @staticmethod
+    def declared_name(stmt:Token)->str:
+        """
+        @return The name declared by a class_dec_stmt or local_var_dec_stmt
+        """
+        name = stmt.token_children[1]
+        if name.token_type == "class_name":
+            name = name.token_children[0]
+        return name.token_value 
+
+# ODL type keyword -> Python type hint
+PYTHON_TYPES = {'int':'int','float':'float','double':'float','char':'str','str':'str',
+                'bool':'bool','duck':'Any','void':'None'}
+
+PYTHON_CONTAINERS = {'array':'List','set':'Set','map':'Dict'}
 
 class CodeGenerator:
-    pass
+    """
+    Python backend. Each class_dec_stmt becomes a Python class whose field
+    members are __slots__, static and class_var members are ClassVar class
+    attributes and methods are stubs raising NotImplementedError.
+    
+    Generated classes are cached by the structure of their declaration, in
+    memory and, with cache_dir, on disk in a cache.SourceCache bounded by
+    max_bytes, so unchanged classes are not generated again. A member
+    declared both as a variable and as a method is a ParserError. Python forbids several bases that all declare slots,
+    so generate_module gives every ancestor of a class with more than one
+    base an instance __dict__ instead of __slots__.
+    """
+    header = ("from __future__ import annotations\n"
+              "from typing import Any, ClassVar, Dict, List, Set\n")
+    
+    def __init__(self, cache_dir:str|None=None, max_bytes:int|None=None):
+        self.cache_dir = cache_dir 
+        self.cache = {}
+        self.disk_cache = None 
+        if cache_dir is not None:
+            from cache import SourceCache
+            self.disk_cache = SourceCache(cache_dir, max_bytes)
+            
+    @staticmethod
+    def python_name(name:str)->str:
+        import keyword
+        return name + "_" if keyword.iskeyword(name) else name 
+    
+    @classmethod
+    def class_name(cls, class_name:Token)->str:
+        parts = []
+        node = class_name
+        while node is not None:
+            parts.append(cls.python_name(node.token_children[0].token_value))
+            node = node.token_children[2] if len(node.token_children) > 2 else None 
+        return ".".join(parts)
+    
+    @classmethod
+    def type_hint(cls, var_type:Token)->str:
+        children = var_type.token_children
+        first = children[0]
+        if first.token_type == "class_name":
+            return cls.class_name(first)
+        if first.token_value in PYTHON_TYPES:
+            return PYTHON_TYPES[first.token_value]
+        arguments = [cls.type_hint(child) for child in children if child.token_type == "var_type"]
+        return f"{PYTHON_CONTAINERS[first.token_value]}[{', '.join(arguments)}]"
+    
+    @staticmethod
+    def fingerprint(root:Token)->str:
+        """
+        @return A digest of the structure of root, stable across processes
+        """
+        import hashlib
+        digest = hashlib.sha256(__version__.encode())
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            children = node.token_children
+            digest.update(f"{node.token_type}\0{node.token_value}\0{len(children)}\0".encode())
+            stack.extend(reversed(children))
+        return digest.hexdigest()
+    
+    @classmethod
+    def bases(cls, stmt:Token)->List[str]:
+        """
+        @return Python names of the classes a class_dec_stmt inherits from
+        """
+        for child in stmt.token_children[2:]:
+            if child.token_type == "class_list":
+                return [cls.class_name(c) for c in child.token_children if c.token_type == "class_name"]
+        return []
+    
+    def generate_class(self, stmt:Token, slots:bool=True)->str:
+        """
+        @param slots Whether fields are __slots__; without them instances
+        keep their fields in a __dict__
+        @return Python source of the class declared by a class_dec_stmt
+        """
+        if not isinstance(stmt, Token):
+            stmt = stmt.to_token()
+        source = self.cache.get((stmt,slots))
+        if source is not None:
+            return source 
+        key = None 
+        if self.disk_cache is not None:
+            key = self.fingerprint(stmt) + ("" if slots else "-dict")
+            source = self.disk_cache.get(key)
+        if source is None:
+            source = self.generate_class_(stmt, slots)
+            if key is not None:
+                self.disk_cache.put(key, source)
+        self.cache[(stmt,slots)] = source 
+        return source 
+    
+    def generate_class_(self, stmt:Token, use_slots:bool=True)->str:
+        name = self.class_name(stmt.token_children[1])
+        bases = self.bases(stmt)
+        slots = []
+        attributes = []
+        methods = []
+        variables = set()
+        for child in stmt.token_children[2:]:
+            if child.token_type == "class_var_dec_stmt":
+                kind = child.token_children[0].token_value 
+                hint = self.type_hint(child.token_children[1])
+                for var_name in child.token_children[2:]:
+                    if var_name.token_type != "var_name":
+                        continue 
+                    field = self.python_name(var_name.token_children[0].token_value)
+                    variables.add(field)
+                    if kind == "field":
+                        slots.append(field)
+                        attributes.append(f"    {field}: {hint}")
+                    else:
+                        attributes.append(f"    {field}: ClassVar[{hint}] = None")
+            elif child.token_type == "class_method_dec_stmt":
+                methods.append(self.generate_method_(child))
+        for child in stmt.token_children[2:]:
+            if child.token_type != "class_method_dec_stmt":
+                continue 
+            for method_name in child.token_children:
+                if method_name.token_type != "method_name":
+                    continue 
+                identifier = method_name.token_children[0]
+                # A def would replace the class attribute, or clash with the slot
+                if self.python_name(identifier.token_value) in variables:
+                    raise ParserError.at(f"{name}.{identifier.token_value} is declared both as a "
+                                         "variable and as a method", identifier)
+        lines = [f"class {name}({', '.join(bases)}):" if bases else f"class {name}:"]
+        if use_slots:
+            lines.append(f"    __slots__ = ({''.join(repr(slot) + ', ' for slot in slots).rstrip()})")
+        elif not attributes and not methods:
+            lines.append("    pass")
+        lines.extend(attributes)
+        for method in methods:
+            lines.append("")
+            lines.extend(method)
+        return "\n".join(lines) + "\n"
+    
+    def generate_method_(self, stmt:Token)->List[str]:
+        kind = "method"
+        parameters = []
+        for child in stmt.token_children:
+            if child.token_type == "keyword" and child.token_value != "override":
+                kind = child.token_value 
+            elif child.token_type == "var_type":
+                returns = self.type_hint(child)
+            elif child.token_type == "method_name":
+                name = self.python_name(child.token_children[0].token_value)
+            elif child.token_type == "type_list":
+                parameters = [f"arg{index}: {self.type_hint(var_type)}" for index, var_type in
+                              enumerate(c for c in child.token_children if c.token_type == "var_type")]
+        lines = []
+        if kind == "static_method":
+            lines.append("    @staticmethod")
+        elif kind == "class_method":
+            lines.append("    @classmethod")
+            parameters.insert(0, "cls")
+        else:
+            parameters.insert(0, "self")
+        if kind == "constructor":
+            name = "__init__"
+            returns = "None"
+        lines.append(f"    def {name}({', '.join(parameters)}) -> {returns}:")
+        lines.append("        raise NotImplementedError")
+        return lines 
+    
+    def generate_module(self, classes:Iterable[Token])->str:
+        """
+        @return Python source of a module declaring classes, each after the
+        bases it inherits from
+        """
+        by_name = {}
+        for stmt in classes:
+            by_name[self.class_name(stmt.token_children[1])] = stmt 
+        # Ancestors of classes with several bases, which must not declare slots
+        shared = set()
+        stack = [base for stmt in by_name.values() if len(self.bases(stmt)) > 1 for base in self.bases(stmt)]
+        while stack:
+            name = stack.pop()
+            if name in by_name and name not in shared:
+                shared.add(name)
+                stack.extend(self.bases(by_name[name]))
+        ordered = []
+        state = {}
+        for root in by_name:
+            stack = [(root,False)]
+            while stack:
+                name, expanded = stack.pop()
+                if expanded:
+                    state[name] = True 
+                    ordered.append(name)
+                    continue 
+                if name in state:
+                    continue 
+                state[name] = False 
+                stack.append((name,True))
+                for base_name in reversed(self.bases(by_name[name])):
+                    if base_name in by_name and base_name not in state:
+                        stack.append((base_name,False))
+        sources = [self.header] + [self.generate_class(by_name[name], name not in shared) for name in ordered]
+        return "\n\n".join(sources)
+    
+    def write_module(self, path:str, classes:Iterable[Token])->None:
+        with open(path, 'w') as file_:
+            file_.write(self.generate_module(classes))
 
 class ParserError(Exception):
-    pass
+    def __init__(self, message:str="", line:int|None=None, column:int|None=None):
+        super().__init__(message, line, column)
+        self.message = message 
+        self.line = line 
+        self.column = column 
+        
+    @classmethod
+    def at(cls, message:str, token:Token|None)->ParserError:
+        """
+        @return An error positioned at token, or unpositioned at end of input
+        """
+        if token is None:
+            return cls(message)
+        return cls(message, token.line, token.column)
+    
+    def __str__(self)->str:
+        if self.line is None:
+            return self.message 
+        return f"{self.message} at line {self.line}, column {self.column}"
+
+def build_scanner_pattern_(identifier:str, word:str=r"\w")->str:
+    """
+    Build the master pattern used by the single pass scanner. Comment rules
+    mirror Tokeniser.remove_line_comments: everything after //, /* or */ is
+    dropped, as is any line whose first non blank character is *.
+    @param identifier Pattern matching an identifier or keyword
+    @param word Character class that may continue an identifier
+    @return Pattern source with one named group per token kind
+    """
+    keywords = "|".join(sorted(KEYWORD, key=len, reverse=True))
+    symbols = "".join(re.escape(s) for s in SYMBOL)
+    return (rf"(?P<comment>^[^\S\n]*\*[^\n]*|//[^\n]*|/\*[^\n]*|\*/[^\n]*)"
+            rf"|(?P<space>[^\S\n]+)|(?P<newline>\n)"
+            rf"|(?P<keyword>(?:{keywords})(?!{word}))"
+            rf"|(?P<identifier>{identifier})"
+            rf"|(?P<symbol>[{symbols}])"
+            rf"|(?P<error>[^\s{symbols}]+)")
 
 class Tokeniser:
     identifier = re.compile(r"^[^\d\W]\w*\Z", re.UNICODE)
+    scanner = re.compile(build_scanner_pattern_(r"[^\d\W]\w*"), re.MULTILINE)
+    symbol_pattern = re.compile("|".join(re.escape(s) for s in SYMBOL))
+    modes = ("line", "scan", "mmap")
     
-    def __init__(self,file:str):
+    def __init__(self,file:str,mode:str="line"):
+        if mode not in self.modes:
+            raise ValueError(f"Unknown tokeniser mode: {mode}")
         self.file = file 
+        self.mode = mode 
         
     def get_tokens(self)->List[Token]|None:
         if os.path.isfile(self.file):
+            if self.mode == "scan":
+                return self.scan_file(self.file)
+            if self.mode == "mmap":
+                from source_buffer import SourceBuffer
+                with SourceBuffer(self.file) as buffer:
+                    return list(buffer.to_tokens())
             return self.get_tokens_from_file(self.file)
         if isinstance(self.file,str):
+            if self.mode != "line":
+                return self.scan(self.file)
             return self.get_tokens_from_line(self.file)
         return None
     
+    def iter_tokens(self)->Iterator[Token]:
+        """
+        Lazily generate tokens, reading a file one line at a time
+        @return An iterator over the tokens get_tokens would return
+        """
+        if os.path.isfile(self.file):
+            return self.iter_tokens_from_file(self.file, self.mode)
+        return self.iter_tokens_from_lines(self.file.splitlines(), self.mode)
+    
     @classmethod
-    def get_tokens_from_file(self, file:str)->List[Token]|None:
+    def iter_tokens_from_file(cls, file:str, mode:str="line")->Iterator[Token]:
+        if mode == "mmap":
+            from source_buffer import SourceBuffer
+            with SourceBuffer(file) as buffer:
+                yield from buffer.to_tokens()
+            return 
+        with open(file, 'r', encoding='utf-8') as file_:
+            yield from cls.iter_tokens_from_lines(file_, mode)
+    
+    @classmethod
+    def iter_tokens_from_lines(cls, lines:Iterable[str], mode:str="line")->Iterator[Token]:
+        """
+        Generate tokens from any iterable of lines, e.g. an open file or a pipe
+        @param lines Source lines, with or without trailing newlines
+        @param mode Tokenise each line with get_tokens_from_line or scan
+        """
+        for line_number, line in enumerate(lines, 1):
+            if mode != "line":
+                yield from cls.scan(line, line_number)
+                continue
+            if line == '\n':
+                continue 
+            output = cls.get_tokens_from_line(line, line_number)
+            if output is not None:
+                yield from output
+    
+    @classmethod
+    def scan_file(cls, file:str)->List[Token]:
+        with open(file, 'r', encoding='utf-8') as file_:
+            return cls.scan(file_.read())
+    
+    @classmethod
+    def scan(cls, buffer:str, first_line:int=1, errors:List[ParserError]|None=None)->List[Token]:
+        """
+        Tokenise a whole buffer in a single pass of the master scanner pattern
+        @param buffer Source text, possibly spanning several lines
+        @param first_line Line number of the start of buffer
+        @param errors If given, unidentifiable tokens are appended to it and
+        skipped instead of raised
+        @return The same token stream get_tokens_from_file produces line by line
+        """
         tokens = []
-        with open(file, 'r') as file_: 
-            hasNextLine = True 
-            while hasNextLine: 
-                line = file_.readline()
-                if line == '':
-                    hasNextLine = False
-                    return tokens 
-                if line == '\n':
-                    continue 
-                output = self.get_tokens_from_line(line)
-                tokens.append(output) if isinstance(output,Token) else tokens.extend(output) 
+        line = first_line 
+        line_start = 0 
+        for match in cls.scanner.finditer(buffer):
+            kind = match.lastgroup
+            if kind == "newline":
+                line += 1 
+                line_start = match.end()
+                continue 
+            if kind == "comment" or kind == "space":
+                continue
+            if kind == "error":
+                error = ParserError(f"Unidentifiable token: {match.group()}", line, match.start()-line_start+1)
+                if errors is None:
+                    raise error 
+                errors.append(error)
+                continue 
+            # Interned so that repeated names share one string across a corpus
+            tokens.append(Token(kind, sys.intern(match.group()), line, match.start()-line_start+1))
         return tokens
     
+    @classmethod
+    def get_tokens_from_file(self, file:str)->List[Token]|None:
+        return list(self.iter_tokens_from_file(file))
+    
     @classmethod 
     def remove_line_comments(self,line:str)->List[str]|None:
         line = line.split("//")[0]
@@ -146,38 +1022,32 @@ class Tokeniser:
     
     @classmethod 
     def is_identifier(self, token:str) -> bool:
-        if re.match(self.identifier,token):
-            if not(token in KEYWORD):
-                return True 
-        return False 
+        return token not in KEYWORDS and self.identifier.match(token) is not None 
     
     @classmethod 
     def is_keyword(self, token:str) -> bool:
-        if token in KEYWORD:
-            return True 
-        return False 
+        return token in KEYWORDS 
     
     @classmethod 
     def is_symbol(self,token:str)->bool:
-        if token in SYMBOL:
-            return True 
-        return False 
+        return token in SYMBOLS 
     
     @classmethod 
     def contain_symbol(self, token:str):
-        for s in SYMBOL:
-            if s in token:
-                return s
-        return False 
+        """
+        @return The first symbol in token, or False if there is none
+        """
+        match = self.symbol_pattern.search(token)
+        return match.group() if match is not None else False 
     
     @classmethod 
     def parse_token(self,token:str)->Token|List[Token]:
-        if self.is_keyword(token):
-            return Token("keyword",token)
+        if token in KEYWORDS:
+            return Token("keyword",sys.intern(token))
+        if token in SYMBOLS:
+            return Token("symbol",sys.intern(token))
         if self.is_identifier(token):
-            return Token("identifier",token)
-        if self.is_symbol(token):
-            return Token("symbol",token)
+            return Token("identifier",sys.intern(token))
         else:
             tokens = [] 
             s = self.contain_symbol(token)
@@ -192,35 +1062,90 @@ class Tokeniser:
                 raise ParserError(f"Unidentifiable token: {token}")
     
     @classmethod
-    def get_tokens_from_line(self, line:str)->List[Token]|None:
+    def get_tokens_from_line(self, line:str, line_number:int=1)->List[Token]|None:
         tokens = [] 
+        source = line 
         line = self.remove_line_comments(line)
         if line is None:
             return None 
+        # Start of the current piece in source; pieces appear in source order
+        offset = 0 
         for token in line.split(" "):
-            output = self.parse_token(token)
+            offset = source.find(token, offset)
+            try:
+                output = self.parse_token(token)
+            except ParserError as error:
+                raise ParserError(error.message, line_number, offset+1)
+            offset += len(token)
             tokens.append(output) if isinstance(output,Token) else tokens.extend(output)
+        # Tokens appear in source order, so each one is found after the last
+        column = 0 
+        for token in tokens:
+            column = source.find(token.token_value, column)
+            token.line = line_number 
+            token.column = column + 1 
+            column += len(token.token_value)
         return tokens
 
-def expect_identifier_(token:Token, parent:Token)->None:
-    if token.token_type != 'identifier':
-        raise ParserError(f"{token.token_value} is not a valid identifier")
+def describe_(token:Token|None)->str:
+    return token.token_value if token is not None else "end of input"
+
+def expect_identifier_(token:Token|None, parent:Token)->None:
+    if token is None or token.kind != KIND_IDENTIFIER:
+        raise ParserError.at(f"{describe_(token)} is not a valid identifier", token)
     parent.add(token)
     
-def expect_keyword_(token:Token, keyword:str, parent:Token)->None:
-    if token.token_type != 'keyword' or token.token_value!=keyword:
-        raise ParserError(f"Expect keyword: {keyword}, Actual: {token.token_value}")
+def expect_keyword_(token:Token|None, keyword:str, parent:Token)->None:
+    if token is None or token.kind != KIND_KEYWORD or token.token_value!=keyword:
+        raise ParserError.at(f"Expect keyword: {keyword}, Actual: {describe_(token)}", token)
     parent.add(token)
     
-def expect_symbol_(token:Token, symbol:str, parent:Token)->None:
-    if token.token_type != 'symbol' or token.token_value != symbol:
-        raise ParserError(f"Expected symbol: {symbol}, Actual: {token.token_value}")
+def expect_symbol_(token:Token|None, symbol:str, parent:Token)->None:
+    if token is None or token.kind != KIND_SYMBOL or token.token_value != symbol:
+        raise ParserError.at(f"Expected symbol: {symbol}, Actual: {describe_(token)}", token)
     parent.add(token)
                   
 class Parser:
-    def __init__(self, tokens:List[Token]|None):
+    predict_tables_ = None 
+    
+    def __init__(self, tokens:List[Token]|None, predictive:bool=False, recover:bool=False):
+        """
+        @param predictive Choose productions from the lookahead keyword
+        instead of trying them in turn
+        @param recover On a syntax error skip to the next ; } class or local
+        and keep parsing instead of stopping. Every error is kept in errors.
+        """
         self.tokens = tokens
         self.c_index = 0 
+        self.predictive = predictive
+        self.recover = recover 
+        self.errors = []
+        
+    @classmethod
+    def predict_tables(cls)->dict:
+        """
+        LL(1) tables mapping a lookahead keyword to the production to apply,
+        derived once from the FIRST sets of grammar.txt
+        """
+        if cls.predict_tables_ is None:
+            from grammar import Grammar
+            grammar = Grammar.from_file(GRAMMAR_FILE)
+            tables = {}
+            for context, productions in (("program",PROGRAM_PRODUCTIONS),
+                                         ("class_body",CLASS_BODY_PRODUCTIONS)):
+                table = grammar.predict(list(productions))
+                tables[context] = {k:productions[rule] for k, rule in table.items()}
+            Parser.predict_tables_ = tables 
+        return cls.predict_tables_
+    
+    def predict_(self, context:str):
+        """
+        @return The bound production selected by the current token, or None
+        """
+        if self.current_kind != KIND_KEYWORD:
+            return None 
+        name = self.predict_tables()[context].get(self.current_value)
+        return getattr(self,name) if name is not None else None 
     
     @property    
     def current_token(self)->Token:
@@ -236,6 +1161,11 @@ class Parser:
     def current_type(self)->str:
         return self.current_token.token_type if self.current_token is not None else None 
     
+    @property
+    def current_kind(self)->int|None:
+        token = self.current_token 
+        return token.kind if token is not None else None 
+    
     def advance(self): 
         self.c_index+=1
 
@@ -271,16 +1201,18 @@ class Parser:
     
     def compile_var_type(self)->Token:
         root = Token("var_type","")
-        if self.current_value in ['int','float','double','char','str','bool','duck','void']:
-            self.expect_keyword(self.current_value,root)
+        token = self.current_token 
+        shape = TYPE_SHAPES.get(token.token_value) if token is not None and token.kind == KIND_KEYWORD else None 
+        if shape == TYPE_SCALAR:
+            self.expect_keyword(token.token_value,root)
             return root 
-        if self.current_value in ['array','set']:
-            self.expect_keyword(self.current_value,root)
+        if shape == TYPE_SEQUENCE:
+            self.expect_keyword(token.token_value,root)
             self.expect_symbol("<",root)
             root.add(self.compile_var_type())
             self.expect_symbol(">",root)
             return root 
-        if self.current_value == "map":
+        if shape == TYPE_MAPPING:
             self.expect_keyword("map",root)
             self.expect_symbol("<",root)
             root.add(self.compile_var_type())
@@ -323,21 +1255,79 @@ class Parser:
         self.expect_symbol("{",root)
         while True:
             try:
-                root.add(self.compile_class_var_dec_stmt())
-            except ParserError:
-                try:
-                    root.add(self.compile_class_method_dec_stmt())
-                except ParserError:
-                    break        
+                member = self.compile_class_member_()
+            except ParserError as error:
+                if not self.recover:
+                    raise 
+                self.errors.append(error)
+                if self.synchronise_("class_body"):
+                    continue 
+                break 
+            if member is None:
+                break 
+            root.add(member)
         self.expect_symbol("}",root)
         return root 
     
+    def compile_class_member_(self)->Token|None:
+        """
+        @return The next class_var_dec_stmt or class_method_dec_stmt, or None
+        at the end of the class body
+        """
+        if self.predictive:
+            production = self.predict_("class_body")
+            if production is not None:
+                return production()
+            if self.recover and self.current_token is not None and self.current_value not in ('}','class','local'):
+                raise ParserError.at(f"Expect member declaration, Actual: {self.current_value}", self.current_token)
+            return None 
+        # A production that failed after consuming tokens is a syntax error
+        # rather than a wrong guess, so it is not retried as the other one
+        start = self.c_index 
+        try:
+            return self.compile_class_var_dec_stmt()
+        except ParserError:
+            if self.c_index != start:
+                raise 
+        try:
+            return self.compile_class_method_dec_stmt()
+        except ParserError:
+            # Without prediction the end of the body is only found by failing on }
+            if self.c_index == start and self.current_value in ('}','class','local',None):
+                return None 
+            raise 
+            
+    def synchronise_(self, scope:str)->bool:
+        """
+        Panic mode recovery after an error in scope, one of class_body,
+        local_var_dec_stmt or class_dec_stmt. Skips tokens up to the next ;
+        ending a member or local declaration, or the next } (consumed unless
+        it closes the class body being recovered), and stops before class or
+        local.
+        @return False if parsing of the current scope should stop
+        """
+        while self.current_token is not None:
+            value = self.current_value 
+            kind = self.current_kind 
+            if value == ';' and kind == KIND_SYMBOL and scope != "class_dec_stmt":
+                self.advance()
+                return True 
+            if value == '}' and kind == KIND_SYMBOL:
+                if scope != "class_body":
+                    self.advance()
+                return True 
+            if value in ('class','local') and kind == KIND_KEYWORD:
+                return scope != "class_body"
+            self.advance()
+        return False 
+    
     def compile_class_var_dec_stmt(self)->Token:
         root = Token("class_var_dec_stmt","")
-        if self.current_value in ['field','static','class_var']:
+        if self.current_value in MEMBER_KEYWORDS:
             self.expect_keyword(self.current_value,root)
         else:
-            raise ParserError()
+            raise ParserError.at(f"Expect keyword: field, static or class_var, Actual: {describe_(self.current_token)}",
+                                 self.current_token)
         root.add(self.compile_var_type())
         root.add(self.compile_varname())
         while self.current_value == ",":
@@ -350,7 +1340,7 @@ class Parser:
         root = Token("class_method_dec_stmt","")
         if self.current_value == "override":
             self.expect_keyword("override",root)
-        if self.current_value in ['constructor','method','static_method','class_method']:
+        if self.current_value in METHOD_KEYWORDS:
             self.expect_keyword(self.current_value,root)
         root.add(self.compile_var_type())
         root.add(self.compile_methodname())
@@ -362,29 +1352,228 @@ class Parser:
         
     def compile_type_list(self)->Token:
         root = Token("type_list","")
-        if self.current_type == 'identifier':
+        if self.current_kind == KIND_IDENTIFIER or self.current_value in NATIVE_TYPES:
             root.add(self.compile_var_type())
             while self.current_value == ",":
                 self.expect_symbol(",",root)
                 root.add(self.compile_var_type())
         return root 
             
-    def compile_program(self)->Token:
-        root = Token("program")
+    def iter_program(self)->Iterator[Token]:
+        """
+        Generate the top level statements of the program as they are parsed
+        """
+        if self.predictive:
+            yield from self.iter_program_predictive_()
+            return 
         while self.current_token is not None:
+            start = self.c_index 
+            scope = "local_var_dec_stmt" if self.current_value == 'local' else "class_dec_stmt"
             try:
-                root.add(self.compile_local_var_dec_stmt())
-            except ParserError:
                 try:
-                    root.add(self.compile_class_dec_stmt())
+                    stmt = self.compile_local_var_dec_stmt()
                 except ParserError:
-                    break
+                    if self.c_index != start:
+                        raise 
+                    stmt = self.compile_class_dec_stmt()
+            except ParserError as error:
+                if self.recover_(error, start, scope):
+                    continue 
+                break
+            yield stmt
+            
+    def iter_program_predictive_(self)->Iterator[Token]:
+        while self.current_token is not None:
+            start = self.c_index 
+            scope = "local_var_dec_stmt" if self.current_value == 'local' else "class_dec_stmt"
+            try:
+                production = self.predict_("program")
+                if production is None:
+                    raise ParserError.at(f"Expect keyword: class or local, Actual: {self.current_value}",
+                                         self.current_token)
+                stmt = production()
+            except ParserError as error:
+                if self.recover_(error, start, scope):
+                    continue 
+                break 
+            yield stmt 
+            
+    def recover_(self, error:ParserError, start:int, scope:str)->bool:
+        """
+        Record a failed top level statement
+        @return True if parsing continues after resynchronising
+        """
+        self.errors.append(error)
+        if not self.recover:
+            return False 
+        if self.c_index == start:
+            self.advance()
+        return self.synchronise_(scope)
+            
+    def compile_program(self)->Token:
+        root = Token("program")
+        for stmt in self.iter_program():
+            root.add(stmt)
         return root
+
+class TokenStream:
+    """
+    Lookahead window over a lazily produced token iterator. Only tokens that
+    have been read but not yet released are held in memory.
+    """
+    def __init__(self, tokens:Iterable[Token]):
+        self.source = iter(tokens)
+        self.window = deque()
+        self.offset = 0 
+        
+    def get(self, index:int)->Token|None:
+        position = index - self.offset
+        if position < 0:
+            raise ParserError(f"Token {index} has already been released")
+        while len(self.window) <= position:
+            token = next(self.source, None)
+            if token is None:
+                return None 
+            self.window.append(token)
+        return self.window[position]
+    
+    def release(self, index:int)->None:
+        """
+        Drop every buffered token before the absolute position index
+        """
+        while self.offset < index and self.window:
+            self.window.popleft()
+            self.offset += 1
+
+class StreamParser(Parser):
+    """
+    Parser reading from a TokenStream instead of a fully materialised list,
+    so peak memory does not grow with the size of the source.
+    """
+    def __init__(self, tokens:Iterable[Token], predictive:bool=False, recover:bool=False):
+        super().__init__(tokens if isinstance(tokens,TokenStream) else TokenStream(tokens), predictive, recover)
     
+    @property    
+    def current_token(self)->Token:
+        return self.tokens.get(self.c_index)
+    
+    def advance(self):
+        self.c_index+=1
+        self.tokens.release(self.c_index)
+    
+import_seconds_ = time.perf_counter() - import_started_
+
+def read_tokens_(path:str, mode:str)->List[Token]:
+    if not os.path.isfile(path):
+        raise ParserError(f"No such file: {path}")
+    return Tokeniser(path, mode).get_tokens()
+
+def parse_file_(args)->Tuple[Token,List[ParserError]]:
+    parser = Parser(read_tokens_(args.file, args.mode), args.predictive, args.recover)
+    return parser.compile_program(), parser.errors
+
+def command_tokenise_(args)->int:
+    write = sys.stdout.write
+    for token in read_tokens_(args.file, args.mode):
+        write(f"{token.line}:{token.column}\t{token.token_type}\t{token.token_value}\n")
+    return 0
+
+def command_parse_(args)->int:
+    program, errors = parse_file_(args)
+    program.render(sys.stdout)
+    for error in errors:
+        print(f"{args.file}: {error}", file=sys.stderr)
+    return 1 if errors else 0
+
+def command_dump_(args)->int:
+    program, errors = parse_file_(args)
+    if args.binary:
+        from serializer import dump
+        with open(args.output, 'wb') as file_:
+            dump(program, file_, not args.no_positions, errors)
+    else:
+        program.dump(args.output)
+    for error in errors:
+        print(f"{args.file}: {error}", file=sys.stderr)
+    return 1 if errors else 0
+
+def command_stats_(args)->int:
+    from instrumentation import Metrics
+    metrics = Metrics()
+    errors = 0
+    if os.path.isfile(args.path):
+        tokeniser = metrics.attach(Tokeniser(args.path, args.mode))
+        parser = metrics.attach(Parser(tokeniser.get_tokens(), args.predictive, recover=True), args.path)
+        parser.compile_program()
+        errors = len(parser.errors)
+    elif os.path.isdir(args.path):
+        cache = None 
+        if args.cache is not None:
+            from cache import ASTCache
+            cache = ASTCache(args.cache)
+        compiler = Compiler(args.path, args.workers, cache, args.recursive, metrics=metrics)
+        compiler.compile_all()
+        errors = sum(len(diagnostics) for diagnostics in compiler.diagnostics.values())
+    else:
+        raise ParserError(f"No such file or directory: {args.path}")
+    print(metrics.to_json())
+    return 1 if errors else 0
+
+def main(argv:List[str]|None=None)->int:
+    """
+    Command line entry point. Without a command the bundled example is parsed.
+    @return Exit status: 0 on success, 1 if a file has syntax errors
+    """
+    import argparse
+    started = time.perf_counter()
+    parser = argparse.ArgumentParser(prog="parser.py", description="Tokenise and parse ODL schema files")
+    parser.add_argument("--version", action="version", version=__version__)
+    parser.add_argument("--import-time", action="store_true",
+                        help="report the time spent importing this module and running the command")
+    # An explicit prog saves add_subparsers from building a help formatter
+    commands = parser.add_subparsers(dest="command", prog="parser.py")
+    tokenise = commands.add_parser("tokenise", help="print the tokens of a file, one per line")
+    parse = commands.add_parser("parse", help="print the parse tree of a file")
+    dump = commands.add_parser("dump", help="write the parse tree of a file to another file")
+    stats = commands.add_parser("stats", help="print timings and counts for a file or directory as JSON")
+    for command in (tokenise, parse, dump, stats):
+        command.add_argument("--mode", choices=Tokeniser.modes, default="scan", help="tokeniser to use")
+    for command in (parse, dump, stats):
+        command.add_argument("--predictive", action="store_true", help="parse with LL(1) prediction")
+    for command in (parse, dump):
+        command.add_argument("--recover", action="store_true", help="report every syntax error")
+    for command in (tokenise, parse, dump):
+        command.add_argument("file")
+    dump.add_argument("output")
+    dump.add_argument("--binary", action="store_true", help="write the serializer format instead of text")
+    dump.add_argument("--no-positions", action="store_true", help="leave positions out of the binary format")
+    stats.add_argument("path", help="a file, or a directory of .oml files")
+    stats.add_argument("-r", "--recursive", action="store_true")
+    stats.add_argument("--workers", type=int, default=None)
+    stats.add_argument("--cache", default=None, help="ASTCache directory")
+    args = parser.parse_args(argv)
+    if args.command is None:
+        # Global flags already parsed, e.g. --import-time, are kept
+        args = parser.parse_args(["parse", EXAMPLE_FILE], namespace=args)
+    handler = {"tokenise":command_tokenise_, "parse":command_parse_,
+               "dump":command_dump_, "stats":command_stats_}[args.command]
+    try:
+        status = handler(args)
+    except ParserError as error:
+        print(f"error: {error}", file=sys.stderr)
+        status = 1 
+    except BrokenPipeError:
+        # The reader, e.g. head, stopped early; silence the flush at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1 
+    if args.import_time:
+        print(f"import: {import_seconds_*1000:.1f} ms, command: {(time.perf_counter()-started)*1000:.1f} ms",
+              file=sys.stderr)
+    return status 
+
 if __name__ == "__main__":
-    p = Tokeniser("Point_Example.oml")
-    tokens = p.get_tokens()
-    parser = Parser(tokens)
-    token = parser.compile_program()
-    print(token)
+    # Modules imported by commands load this file as parser; share this copy
+    # so that there is one set of classes
+    sys.modules.setdefault("parser", sys.modules[__name__])
+    sys.exit(main())
     
\ No newline at end of file
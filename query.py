@@ -0,0 +1,165 @@
+from __future__ import annotations
+from collections import defaultdict
+from typing import Iterable, List, Tuple
+
+from parser import Token
+from symbol_table import ClassSymbol, FieldSymbol, MethodSymbol, referenced_classes, type_name
+
+class QueryError(Exception):
+    pass
+
+EMPTY = ()
+
+def normalise_type(spelling:str)->str:
+    """
+    @return spelling in the form type_name produces, e.g. "map<str,Point>"
+    for "map< str, Point >"
+    """
+    return "".join(spelling.split())
+
+class SchemaIndex:
+    """
+    Inverted indexes over the declarations of compiled programs, built in a
+    single pass so that queries are dictionary lookups and never walk the
+    trees again. Types are indexed both by their full spelling, e.g.
+    "array<Point>", and by every class they reference, so fields of type
+    array<Point> are found by fields_referencing("Point") too. Every
+    overload of a method is indexed. A class overrides a method when it
+    declares it with the override keyword.
+
+    Results are shared tuples and must not be modified. The index is a
+    snapshot; build a new one after recompiling.
+    """
+    # Query kind accepted by batch -> (index attribute, normalise the argument as a type)
+    queries = {"fields_of_type":("fields_by_type",True),
+               "fields_referencing":("fields_by_reference",False),
+               "methods_taking":("methods_by_parameter",True),
+               "methods_referencing":("methods_by_parameter_reference",False),
+               "methods_returning":("methods_by_return",True),
+               "methods_named":("methods_by_name",False),
+               "overriding":("overrides",False)}
+
+    def __init__(self):
+        self.classes = {}
+        self.fields_by_type = {}
+        self.fields_by_reference = {}
+        self.methods_by_parameter = {}
+        self.methods_by_parameter_reference = {}
+        self.methods_by_return = {}
+        self.methods_by_name = {}
+        self.overrides = {}
+
+    @classmethod
+    def from_programs(cls, programs:Iterable[Token])->SchemaIndex:
+        """
+        @param programs Program trees, Tokens or CompactNodes
+        """
+        return cls.from_classes(stmt for program in programs for stmt in program.token_children
+                                if stmt.token_type == "class_dec_stmt")
+
+    @classmethod
+    def from_compiler(cls, compiler)->SchemaIndex:
+        return cls.from_classes(compiler.class_list.values())
+
+    @classmethod
+    def from_classes(cls, statements:Iterable[Token])->SchemaIndex:
+        index = cls()
+        lists = {name:defaultdict(list) for name, _ in cls.queries.values()}
+        fields_by_type = lists["fields_by_type"]
+        fields_by_reference = lists["fields_by_reference"]
+        methods_by_parameter = lists["methods_by_parameter"]
+        methods_by_parameter_reference = lists["methods_by_parameter_reference"]
+        methods_by_return = lists["methods_by_return"]
+        methods_by_name = lists["methods_by_name"]
+        overrides = lists["overrides"]
+        for stmt in statements:
+            symbol = ClassSymbol.from_token(stmt)
+            index.classes[symbol.name] = symbol
+            # Fields declared together share one var_type subtree
+            spellings = {}
+            for field in symbol.fields.values():
+                key = id(field.var_type)
+                if key not in spellings:
+                    spellings[key] = (type_name(field.var_type), set(referenced_classes(field.var_type)))
+                spelling, references = spellings[key]
+                fields_by_type[spelling].append(field)
+                for reference in references:
+                    fields_by_reference[reference].append(field)
+            overridden = set()
+            for method in symbol.iter_methods():
+                methods_by_name[method.name].append(method)
+                methods_by_return[type_name(method.return_type)].append(method)
+                if method.override and method.name not in overridden:
+                    overridden.add(method.name)
+                    overrides[method.name].append(symbol.name)
+                spellings = set()
+                references = set()
+                for var_type in method.parameter_types:
+                    spellings.add(type_name(var_type))
+                    references.update(referenced_classes(var_type))
+                for spelling in spellings:
+                    methods_by_parameter[spelling].append(method)
+                for reference in references:
+                    methods_by_parameter_reference[reference].append(method)
+        for name, values in lists.items():
+            setattr(index, name, {key:tuple(value) for key, value in values.items()})
+        return index
+
+    def index_(self, kind:str)->Tuple[dict,bool]:
+        try:
+            name, is_type = self.queries[kind]
+        except KeyError:
+            raise QueryError(f"Unknown query: {kind}") from None
+        return getattr(self, name), is_type
+
+    def fields_of_type(self, spelling:str)->Tuple[FieldSymbol,...]:
+        return self.fields_by_type.get(normalise_type(spelling), EMPTY)
+
+    def fields_referencing(self, class_name:str)->Tuple[FieldSymbol,...]:
+        return self.fields_by_reference.get(class_name, EMPTY)
+
+    def methods_taking(self, spelling:str)->Tuple[MethodSymbol,...]:
+        """
+        @return Methods with a parameter of exactly the type spelling
+        """
+        return self.methods_by_parameter.get(normalise_type(spelling), EMPTY)
+
+    def methods_referencing(self, class_name:str)->Tuple[MethodSymbol,...]:
+        """
+        @return Methods with a parameter whose type uses class_name anywhere
+        """
+        return self.methods_by_parameter_reference.get(class_name, EMPTY)
+
+    def methods_returning(self, spelling:str)->Tuple[MethodSymbol,...]:
+        return self.methods_by_return.get(normalise_type(spelling), EMPTY)
+
+    def methods_named(self, name:str)->Tuple[MethodSymbol,...]:
+        return self.methods_by_name.get(name, EMPTY)
+
+    def overriding(self, method:str)->Tuple[str,...]:
+        """
+        @return Names of the classes declaring method with override
+        """
+        return self.overrides.get(method, EMPTY)
+
+    def batch(self, queries:Iterable[Tuple[str,str]])->List[tuple]:
+        """
+        Answer many queries at once. Queries are grouped by kind and each
+        group is resolved with a single map over the index.
+        @param queries (kind, argument) pairs, kind naming one of the query
+        methods, e.g. ("fields_of_type", "array<Point>")
+        @return The result of each query, in order
+        """
+        queries = list(queries)
+        results = [EMPTY]*len(queries)
+        groups = defaultdict(list)
+        for position, (kind, _) in enumerate(queries):
+            groups[kind].append(position)
+        for kind, positions in groups.items():
+            index, is_type = self.index_(kind)
+            arguments = [queries[position][1] for position in positions]
+            if is_type:
+                arguments = map(normalise_type, arguments)
+            for position, result in zip(positions, map(index.get, arguments, [EMPTY]*len(positions))):
+                results[position] = result
+        return results
@@ -0,0 +1,287 @@
+from __future__ import annotations
+import re
+import sys
+from array import array
+from collections import Counter
+from typing import BinaryIO, List, Tuple
+
+from compact_tree import CompactTree
+from parser import ParserError, Token
+
+# Binary format for parse trees, much smaller than pickled Tokens and
+# faster to load than parsing the source again. Loading into a CompactTree,
+# as load, loads_tree and cache.ASTCache do, takes about a third of the time
+# of parsing; building Token objects with loads costs most of what it saves,
+# so it is only worth it where a caller needs mutable Tokens. The layout is:
+#
+#     magic 'ODLB', version byte, flags byte
+#     string table     count, then each string as length and UTF-8 bytes
+#     nodes            count and byte length, then in pre-order: type, value
+#                      and child count, followed by line and column when
+#                      POSITIONS is set
+#     errors           count, then message, line and column of each
+#
+# Every integer is an unsigned LEB128 varint. Node types and values are
+# indices into the string table, which is ordered by frequency so that
+# nearly every index fits a single byte. Positions are one based, 0 marking
+# an unknown position. A known line is stored as one more than the zigzag
+# coded difference from the last known line.
+MAGIC = b"ODLB"
+VERSION = 1
+# Header flag set when every node is followed by its line and column
+POSITIONS = 0x01
+
+CONTINUATION = re.compile(rb"[\x80-\xff]+")
+
+class FormatError(Exception):
+    pass
+
+def write_varint_(output:bytearray, value:int)->None:
+    while value >= 0x80:
+        output.append((value & 0x7f) | 0x80)
+        value >>= 7
+    output.append(value)
+
+def read_varint_(data:bytes, position:int)->Tuple[int,int]:
+    """
+    @return The varint at position and the position just past it
+    """
+    result = 0
+    shift = 0
+    while True:
+        try:
+            byte = data[position]
+        except IndexError:
+            raise FormatError("Truncated data") from None
+        position += 1
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result, position
+        shift += 7
+
+def read_varints_(data:bytes)->List[int]:
+    """
+    Decode a run of varints at once; nearly all of them are a single byte
+    @return The values of the varints filling data
+    """
+    if data and data[-1] >= 0x80:
+        raise FormatError("Truncated data")
+    output = []
+    position = 0
+    for match in CONTINUATION.finditer(data):
+        start = match.start()
+        output.extend(data[position:start])
+        output.append(read_varint_(data, start)[0])
+        position = match.end()+1
+    output.extend(data[position:])
+    return output
+
+def flatten_(root:Token|CompactTree)->Tuple[list,list,list,list,list]:
+    """
+    @return Pre-order lists of the types, values, child counts, lines and
+    columns of the nodes of root
+    """
+    if isinstance(root, CompactTree):
+        counts = [0]*len(root)
+        for parent in root.parent:
+            if parent != -1:
+                counts[parent] += 1
+        return ([root.types[code] for code in root.type_codes],
+                [root.values[code] for code in root.value_codes],
+                counts, root.lines, root.columns)
+    types, values, counts, lines, columns = [], [], [], [], []
+    stack = [root]
+    while stack:
+        token = stack.pop()
+        types.append(token.token_type)
+        values.append(token.token_value)
+        counts.append(len(token.token_children))
+        lines.append(token.line or 0)
+        columns.append(token.column or 0)
+        stack.extend(reversed(token.token_children))
+    return types, values, counts, lines, columns
+
+def dumps(root:Token|CompactTree, positions:bool=True, errors:List[ParserError]|None=None)->bytes:
+    """
+    Serialise a parse tree. The errors of a CompactTree are written along
+    with it unless errors is given.
+    @param positions Whether to keep the line and column of every node
+    """
+    if errors is None:
+        errors = getattr(root, 'errors', [])
+    types, values, counts, lines, columns = flatten_(root)
+    frequency = Counter(types)
+    frequency.update(values)
+    strings = {string: index for index, (string, _) in enumerate(frequency.most_common())}
+    output = bytearray(MAGIC)
+    output.append(VERSION)
+    output.append(POSITIONS if positions else 0)
+    write_varint_(output, len(strings))
+    for string in strings:
+        encoded = string.encode('utf-8')
+        write_varint_(output, len(encoded))
+        output += encoded
+    nodes = bytearray()
+    previous_line = 0
+    for index in range(len(types)):
+        write_varint_(nodes, strings[types[index]])
+        write_varint_(nodes, strings[values[index]])
+        write_varint_(nodes, counts[index])
+        if positions:
+            line = lines[index]
+            if line:
+                delta = line - previous_line
+                write_varint_(nodes, (delta*2 if delta >= 0 else -delta*2-1) + 1)
+                previous_line = line
+            else:
+                write_varint_(nodes, 0)
+            write_varint_(nodes, columns[index])
+    write_varint_(output, len(types))
+    write_varint_(output, len(nodes))
+    output += nodes
+    write_varint_(output, len(errors))
+    for error in errors:
+        encoded = error.message.encode('utf-8')
+        write_varint_(output, len(encoded))
+        output += encoded
+        write_varint_(output, error.line or 0)
+        write_varint_(output, error.column or 0)
+    return bytes(output)
+
+def decode_(data:bytes)->Tuple[list,list,list,list,list,list,List[ParserError]]:
+    """
+    @return The string table, the pre-order node arrays and the errors
+    """
+    if data[:len(MAGIC)] != MAGIC:
+        raise FormatError("Not a serialised parse tree")
+    position = len(MAGIC)
+    if len(data) < position+2:
+        raise FormatError("Truncated data")
+    if data[position] != VERSION:
+        raise FormatError(f"Unsupported format version: {data[position]}")
+    positions = data[position+1] & POSITIONS
+    position += 2
+    count, position = read_varint_(data, position)
+    strings = []
+    for _ in range(count):
+        length, position = read_varint_(data, position)
+        end = position+length
+        if end > len(data):
+            raise FormatError("Truncated data")
+        strings.append(sys.intern(data[position:end].decode('utf-8')))
+        position = end
+    count, position = read_varint_(data, position)
+    length, position = read_varint_(data, position)
+    values = read_varints_(data[position:position+length])
+    position += length
+    fields = 5 if positions else 3
+    if len(values) != count*fields:
+        raise FormatError("Truncated data")
+    type_codes, value_codes, counts = values[0::fields], values[1::fields], values[2::fields]
+    if positions:
+        lines, columns = [], values[4::fields]
+        line = 0
+        for code in values[3::fields]:
+            if code:
+                code -= 1
+                line += -(code+1 >> 1) if code & 1 else code >> 1
+                lines.append(line)
+            else:
+                lines.append(0)
+    else:
+        lines = columns = [0]*count
+    if count and (max(type_codes) >= len(strings) or max(value_codes) >= len(strings)):
+        raise FormatError("String index out of range")
+    errors = []
+    count, position = read_varint_(data, position)
+    for _ in range(count):
+        length, position = read_varint_(data, position)
+        message = data[position:position+length].decode('utf-8')
+        position += length
+        line, position = read_varint_(data, position)
+        column, position = read_varint_(data, position)
+        errors.append(ParserError(message, line or None, column or None))
+    return strings, type_codes, value_codes, counts, lines, columns, errors
+
+def loads(data:bytes)->Token:
+    """
+    @return The Token tree serialised in data; loads_tree is much faster
+    """
+    strings, type_codes, value_codes, counts, lines, columns, _ = decode_(data)
+    if not type_codes:
+        raise FormatError("Empty tree")
+    tokens = [Token(strings[type_code], strings[value_code], line or None, column or None)
+              for type_code, value_code, line, column in zip(type_codes, value_codes, lines, columns)]
+    # [children, number still to attach] of every open ancestor
+    stack = []
+    for index, (token, count) in enumerate(zip(tokens, counts)):
+        if stack:
+            parent = stack[-1]
+            parent[0].append(token)
+            parent[1] -= 1
+            if not parent[1]:
+                stack.pop()
+        elif index:
+            raise FormatError("More than one root")
+        if count:
+            token.token_children = []
+            stack.append([token.token_children, count])
+    if stack:
+        raise FormatError("Truncated tree")
+    return tokens[0]
+
+def loads_tree(data:bytes)->CompactTree:
+    """
+    @return The tree serialised in data as a CompactTree, with its errors
+    """
+    strings, type_codes, value_codes, counts, lines, columns, errors = decode_(data)
+    tree = CompactTree()
+    tree.errors = errors
+    # Separate type and value tables as CompactTree expects
+    type_index, value_index = {}, {}
+    for code in type_codes:
+        if code not in type_index:
+            type_index[code] = len(tree.types)
+            tree.types.append(strings[code])
+    for code in value_codes:
+        if code not in value_index:
+            value_index[code] = len(tree.values)
+            tree.values.append(strings[code])
+    tree.type_codes = array('B', [type_index[code] for code in type_codes])
+    tree.value_codes = array('I', [value_index[code] for code in value_codes])
+    size = len(type_codes)
+    tree.parent = array('i', [-1])*size
+    tree.first_child = array('i', [-1])*size
+    tree.next_sibling = array('i', [-1])*size
+    tree.lines = array('I', lines)
+    tree.columns = array('I', columns)
+    # [index, children still to attach, last attached child] of open ancestors
+    stack = []
+    for index in range(size):
+        if stack:
+            parent = stack[-1]
+            tree.parent[index] = parent[0]
+            if parent[2] == -1:
+                tree.first_child[parent[0]] = index
+            else:
+                tree.next_sibling[parent[2]] = index
+            parent[2] = index
+            parent[1] -= 1
+            if not parent[1]:
+                stack.pop()
+        elif index:
+            raise FormatError("More than one root")
+        if counts[index]:
+            stack.append([index, counts[index], -1])
+    if stack:
+        raise FormatError("Truncated tree")
+    return tree
+
+def dump(root:Token|CompactTree, file:BinaryIO, positions:bool=True, errors:List[ParserError]|None=None)->None:
+    file.write(dumps(root, positions, errors))
+
+def load(file:BinaryIO)->CompactTree:
+    """
+    @return The tree serialised in file as a CompactTree, with its errors
+    """
+    return loads_tree(file.read())
@@ -0,0 +1,246 @@
+from __future__ import annotations
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, Iterable, List
+
+from parser import Compiler, compile_source_, decode_source_
+
+def read_file_(path:str)->bytes:
+    with open(path, 'rb') as file_:
+        return file_.read()
+
+def declarations_(tree)->Dict[str,List[str]]:
+    """
+    @return Names of the classes and locals declared in a CompactTree
+    """
+    output = {"classes":[], "locals":[]}
+    for stmt in tree.node().token_children:
+        if stmt.token_type == "class_dec_stmt":
+            output["classes"].append(Compiler.declared_name(stmt))
+        elif stmt.token_type == "local_var_dec_stmt":
+            output["locals"].append(Compiler.declared_name(stmt))
+    return output
+
+class CompileService:
+    """
+    asyncio front end letting many callers, in process or over a local
+    socket, share one worker pool and one ASTCache.
+
+    Files are read and the cache accessed on threads so the event loop never
+    blocks on disk; parsing runs on the worker pool. Requests are keyed by
+    file content, so concurrent requests for identical sources wait for one
+    compilation. At most max_pending sources are queued on the pool at once;
+    further requests wait for a slot, which pushes back on callers and
+    socket clients instead of growing the pool's queue without bound.
+    """
+    def __init__(self, workers:int|None=None, cache=None, max_pending:int=64, executor:Executor|None=None):
+        """
+        @param cache Optional cache.ASTCache shared by every request
+        @param executor Pool to parse on; by default a ProcessPoolExecutor
+        of workers processes, created on first use and shut down by close
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.cache = cache
+        self.executor = executor
+        self.owns_executor = executor is None
+        self.max_pending = max_pending
+        self.slots_ = None
+        self.cache_lock_ = None
+        self.in_flight = {}
+        self.stats = {"requests":0, "compiled":0, "cache_hits":0, "shared":0}
+
+    @property
+    def slots(self)->asyncio.Semaphore:
+        # Created lazily so that it belongs to the loop the service runs on
+        if self.slots_ is None:
+            self.slots_ = asyncio.Semaphore(self.max_pending)
+            self.cache_lock_ = asyncio.Lock()
+        return self.slots_
+
+    def key(self, content:bytes)->str:
+        if self.cache is not None:
+            return self.cache.key(content)
+        return hashlib.sha256(content).hexdigest()
+
+    async def compile_file(self, path:str):
+        """
+        @return The CompactTree of path
+        """
+        self.stats["requests"] += 1
+        content = await asyncio.to_thread(read_file_, path)
+        key = self.key(content)
+        task = self.in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self.compile_content_(key, content))
+            self.in_flight[key] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        else:
+            self.stats["shared"] += 1
+        # One caller giving up must not cancel the compilation others wait for
+        return await asyncio.shield(task)
+
+    async def compile_content_(self, key:str, content:bytes):
+        slots = self.slots
+        if self.cache is not None:
+            tree = await asyncio.to_thread(self.cache.get, key)
+            if tree is not None:
+                self.stats["cache_hits"] += 1
+                return tree
+        async with slots:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            loop = asyncio.get_running_loop()
+            tree = await loop.run_in_executor(self.executor, compile_source_, decode_source_(content))
+        self.stats["compiled"] += 1
+        if self.cache is not None:
+            async with self.cache_lock_:
+                await asyncio.to_thread(self.cache.put, key, tree)
+        return tree
+
+    async def compile(self, paths:Iterable[str])->Dict[str,object]:
+        """
+        @return Mapping from each path to its CompactTree
+        """
+        paths = list(paths)
+        trees = await asyncio.gather(*(self.compile_file(path) for path in paths))
+        return dict(zip(paths, trees))
+
+    async def validate(self, paths:Iterable[str])->dict:
+        """
+        Compile paths and check their declarations together
+        @return {"files": syntax errors of each path, "symbols": problems
+        found by symbol_table.SymbolTable.validate}
+        """
+        trees = await self.compile(paths)
+        return await asyncio.to_thread(self.validate_trees_, trees)
+
+    @staticmethod
+    def validate_trees_(trees:dict)->dict:
+        from symbol_table import SymbolTable
+        table = SymbolTable()
+        for tree in trees.values():
+            table.add_program(tree.node())
+        return {"files":{path:[str(error) for error in tree.errors] for path, tree in trees.items()},
+                "symbols":[str(error) for error in table.validate()]}
+
+    async def close(self)->None:
+        if self.owns_executor and self.executor is not None:
+            executor, self.executor = self.executor, None
+            await asyncio.to_thread(executor.shutdown)
+
+    async def __aenter__(self)->CompileService:
+        return self
+
+    async def __aexit__(self, *exc_info)->None:
+        await self.close()
+
+    async def handle_request(self, request:dict)->dict:
+        """
+        Answer one request of the socket protocol:
+            {"id": 1, "method": "compile", "paths": [...], "trees": false}
+            {"id": 2, "method": "validate", "paths": [...]}
+        compile answers with the declared classes and syntax errors of each
+        path, and with "trees" the tree in serializer format, base64 encoded.
+        Every failure answers {"id": ..., "error": message}.
+        """
+        response = {"id":request.get("id")}
+        try:
+            method = request.get("method")
+            paths = request.get("paths")
+            if not isinstance(paths, list) or not all(isinstance(path, str) for path in paths):
+                raise ValueError("paths must be a list of strings")
+            if method == "compile":
+                result = {}
+                for path, tree in (await self.compile(paths)).items():
+                    result[path] = entry = {"declarations":declarations_(tree),
+                                            "errors":[str(error) for error in tree.errors]}
+                    if request.get("trees"):
+                        from serializer import dumps
+                        entry["tree"] = base64.b64encode(dumps(tree)).decode('ascii')
+                response["result"] = result
+            elif method == "validate":
+                response["result"] = await self.validate(paths)
+            else:
+                raise ValueError(f"Unknown method: {method}")
+        except (OSError, ValueError) as error:
+            response["error"] = str(error)
+        except Exception as error:
+            # Anything else, e.g. a worker process dying, must still be
+            # answered or the client waits for this id forever
+            response["error"] = f"{type(error).__name__}: {error}"
+        return response
+
+    async def handle_connection_(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter)->None:
+        # Requests on one connection are answered concurrently, in completion
+        # order; the id field matches answers to requests
+        tasks = set()
+        lock = asyncio.Lock()
+
+        async def answer(request:dict)->None:
+            response = await self.handle_request(request)
+            async with lock:
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    request = None
+                if not isinstance(request, dict):
+                    async with lock:
+                        writer.write(json.dumps({"id":None, "error":"Malformed request"}).encode() + b"\n")
+                        await writer.drain()
+                    continue
+                # Stop reading, and so let the socket buffers fill, while the
+                # service is saturated
+                while len(tasks) >= self.max_pending:
+                    await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                task = asyncio.ensure_future(answer(request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.wait(tasks)
+        finally:
+            writer.close()
+
+    async def serve(self, path:str|None=None, host:str="127.0.0.1", port:int=0)->asyncio.AbstractServer:
+        """
+        Listen for JSON lines requests on the Unix socket path, or on a TCP
+        port of host where Unix sockets are not available
+        """
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle_connection_, path)
+        return await asyncio.start_server(self.handle_connection_, host, port)
+
+def main(argv:List[str]|None=None)->None:
+    parser = argparse.ArgumentParser(description="Serve ODL compile requests on a local socket")
+    parser.add_argument("socket", help="path of the Unix socket to listen on")
+    parser.add_argument("--cache", help="ASTCache directory shared by every request")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-pending", type=int, default=64)
+    args = parser.parse_args(argv)
+    cache = None
+    if args.cache is not None:
+        from cache import ASTCache
+        cache = ASTCache(args.cache)
+
+    async def run()->None:
+        async with CompileService(args.workers, cache, args.max_pending) as service:
+            server = await service.serve(args.socket)
+            async with server:
+                await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+from __future__ import annotations
+import mmap
+import re
+import sys
+from array import array
+from bisect import bisect_right
+from typing import Iterator, Tuple
+
+from parser import ParserError, Token, build_scanner_pattern_
+
+class SourceBuffer:
+    """
+    Memory-mapped, read only view of a source file. Tokens are produced as
+    (kind, start, end) byte offsets into the mapping, so scanning copies no
+    text; token values are only decoded by text() when asked for.
+    
+    Identifiers may contain any non-ASCII UTF-8 byte, which the bytes scanner
+    cannot classify further.
+    """
+    scanner = re.compile(build_scanner_pattern_(r"[A-Za-z_\x80-\xff][\w\x80-\xff]*", 
+                                                r"[\w\x80-\xff]").encode(), re.MULTILINE)
+    
+    def __init__(self, path:str):
+        self.path = path 
+        self.file_ = open(path, 'rb')
+        try:
+            self.buffer = mmap.mmap(self.file_.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            self.buffer = b""
+        self.line_starts_ = None 
+        
+    def __enter__(self)->SourceBuffer:
+        return self 
+    
+    def __exit__(self, *exc_info)->None:
+        self.close()
+        
+    def __len__(self)->int:
+        return len(self.buffer)
+        
+    def close(self)->None:
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self.file_.close()
+        
+    def tokens(self)->Iterator[Tuple[str,int,int]]:
+        """
+        Generate (kind, start, end) for every token, kind being the Token type
+        """
+        for match in self.scanner.finditer(self.buffer):
+            kind = match.lastgroup
+            if kind == "comment" or kind == "space" or kind == "newline":
+                continue 
+            if kind == "error":
+                line, column = self.position(match.start())
+                raise ParserError(f"Unidentifiable token: {self.text(match.start(), match.end())}", line, column)
+            yield kind, match.start(), match.end()
+            
+    def text(self, start:int, end:int)->str:
+        """
+        @raise ParserError At the first byte of the range that is not valid UTF-8
+        """
+        try:
+            return self.buffer[start:end].decode()
+        except UnicodeDecodeError as error:
+            line, column = self.position(start + error.start)
+            raise ParserError(f"Invalid UTF-8: {error.reason}", line, column) from None
+    
+    def position(self, offset:int)->Tuple[int,int]:
+        """
+        @return The one based line and column of a byte offset; columns
+        count bytes, not characters
+        """
+        if self.line_starts_ is None:
+            self.line_starts_ = array('q', [0])
+            self.line_starts_.extend(match.end() for match in re.finditer(rb"\n", self.buffer))
+        line = bisect_right(self.line_starts_, offset)
+        return line, offset - self.line_starts_[line-1] + 1
+    
+    def to_tokens(self)->Iterator[Token]:
+        """
+        Adapter producing regular Tokens from the offset stream
+        """
+        for kind, start, end in self.tokens():
+            yield Token(kind, sys.intern(self.text(start, end)), *self.position(start))
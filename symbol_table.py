@@ -0,0 +1,418 @@
+from __future__ import annotations
+from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Tuple
+
+from parser import Token
+
+class SymbolError(Exception):
+    pass
+
+def dotted_name(class_name:Token)->str:
+    """
+    @return The full dotted name spelled by a class_name subtree, e.g. "a.b.C"
+    """
+    parts = []
+    node = class_name
+    while node is not None:
+        children = node.token_children
+        parts.append(children[0].token_value)
+        node = children[2] if len(children) > 2 else None 
+    return ".".join(parts)
+
+def type_name(var_type:Token)->str:
+    """
+    @return The canonical spelling of a var_type subtree, e.g. "map<str,Point>"
+    """
+    parts = []
+    for child in var_type.token_children:
+        if child.token_type == "var_type":
+            parts.append(type_name(child))
+        elif child.token_type == "class_name":
+            parts.append(dotted_name(child))
+        else:
+            parts.append(child.token_value)
+    return "".join(parts)
+
+def referenced_classes(var_type:Token)->Iterator[str]:
+    """
+    Generate the dotted names of every declared type used in a var_type subtree
+    """
+    stack = [var_type]
+    while stack:
+        node = stack.pop()
+        for child in node.token_children:
+            if child.token_type == "var_type":
+                stack.append(child)
+            elif child.token_type == "class_name":
+                yield dotted_name(child)
+
+class FieldSymbol:
+    __slots__ = ("name","kind","var_type","owner")
+    
+    def __init__(self, name:str, kind:str, var_type:Token, owner:str):
+        self.name = name 
+        self.kind = kind 
+        self.var_type = var_type 
+        self.owner = owner 
+        
+class MethodSymbol:
+    __slots__ = ("name","kind","override","return_type","parameter_types","owner","signature")
+    
+    def __init__(self, name:str, kind:str, override:bool, return_type:Token, 
+                 parameter_types:List[Token], owner:str):
+        self.name = name 
+        self.kind = kind 
+        self.override = override 
+        self.return_type = return_type 
+        self.parameter_types = parameter_types 
+        self.owner = owner 
+        # Spelling of every parameter type, which tells overloads apart
+        self.signature = tuple(type_name(var_type) for var_type in parameter_types)
+        
+    @property
+    def key(self)->Tuple[str,Tuple[str,...]]:
+        return self.name, self.signature 
+        
+    @classmethod
+    def from_token(cls, stmt:Token, owner:str)->MethodSymbol:
+        override = False 
+        kind = "method"
+        for item in stmt.token_children:
+            if item.token_type == "keyword":
+                if item.token_value == "override":
+                    override = True 
+                else:
+                    kind = item.token_value 
+            elif item.token_type == "var_type":
+                return_type = item 
+            elif item.token_type == "method_name":
+                name = item.token_children[0].token_value 
+            elif item.token_type == "type_list":
+                parameter_types = [t for t in item.token_children if t.token_type == "var_type"]
+        return cls(name, kind, override, return_type, parameter_types, owner)
+        
+class ClassSymbol:
+    """
+    Declarations of one class. methods maps each method name to its
+    overloads in declaration order.
+    """
+    __slots__ = ("name","superclasses","fields","methods","node")
+    
+    def __init__(self, name:str, superclasses:List[str], node:Token):
+        self.name = name 
+        self.superclasses = superclasses 
+        self.fields = {}
+        self.methods = {}
+        self.node = node 
+        
+    @classmethod
+    def from_token(cls, stmt:Token)->ClassSymbol:
+        children = stmt.token_children
+        symbol = cls(dotted_name(children[1]), [], stmt)
+        for child in children[2:]:
+            if child.token_type == "class_list":
+                symbol.superclasses = [dotted_name(name) for name in child.token_children
+                                       if name.token_type == "class_name"]
+            elif child.token_type == "class_var_dec_stmt":
+                kind = child.token_children[0].token_value
+                var_type = child.token_children[1]
+                for name in child.token_children[2:]:
+                    if name.token_type == "var_name":
+                        value = name.token_children[0].token_value
+                        symbol.fields[value] = FieldSymbol(value, kind, var_type, symbol.name)
+            elif child.token_type == "class_method_dec_stmt":
+                method = MethodSymbol.from_token(child, symbol.name)
+                symbol.methods.setdefault(method.name, []).append(method)
+        return symbol 
+    
+    def iter_methods(self)->Iterator[MethodSymbol]:
+        for overloads in self.methods.values():
+            yield from overloads 
+
+class SymbolTable:
+    """
+    Index of class declarations by dotted name with superclass and subclass
+    edges. Ancestor sets, method resolution orders and per-class method tables
+    are computed on first use and cached until a class or alias changes, so
+    repeated queries are dictionary or set lookups.
+    """
+    def __init__(self):
+        self.classes = {}
+        self.aliases = {}
+        self.subclasses_ = defaultdict(set)
+        # name -> classes listing it as a superclass, and aliases listing it
+        self.class_users_ = defaultdict(set)
+        self.alias_users_ = defaultdict(set)
+        self.ancestors_ = {}
+        self.mro_ = {}
+        self.method_tables_ = {}
+        
+    def __len__(self)->int:
+        return len(self.classes)
+    
+    def __contains__(self, name:str)->bool:
+        return name in self.classes
+    
+    def clear_cache_(self)->None:
+        self.ancestors_.clear()
+        self.mro_.clear()
+        self.method_tables_.clear()
+        
+    def add_program(self, program:Token)->None:
+        for stmt in program.token_children:
+            if stmt.token_type == "class_dec_stmt":
+                self.add_class(stmt)
+            elif stmt.token_type == "local_var_dec_stmt":
+                self.add_local(stmt)
+                
+    def add_local(self, stmt:Token)->None:
+        """
+        Register a local group alias, e.g. local shapes = Polygon, Circle;
+        """
+        name = stmt.token_children[1].token_value
+        class_list = stmt.token_children[3]
+        members = [dotted_name(child) for child in class_list.token_children
+                   if child.token_type == "class_name"]
+        self.relink_(name, lambda: self.set_alias_(name, members))
+        
+    def remove_local(self, name:str)->None:
+        if name not in self.aliases:
+            raise KeyError(name)
+        self.relink_(name, lambda: self.set_alias_(name, None))
+        
+    def set_alias_(self, name:str, members:List[str]|None)->None:
+        for member in self.aliases.pop(name, ()):
+            self.alias_users_[member].discard(name)
+        if members is not None:
+            self.aliases[name] = members 
+            for member in members:
+                self.alias_users_[member].add(name)
+                
+    def add_class(self, stmt:Token)->ClassSymbol:
+        symbol = ClassSymbol.from_token(stmt)
+        if symbol.name in self.classes:
+            self.remove_class(symbol.name)
+        # A class hides an alias of the same name from classes using it
+        self.relink_(symbol.name, lambda: self.link_class_(symbol), symbol.name in self.aliases)
+        return symbol 
+    
+    def remove_class(self, name:str)->None:
+        self.relink_(name, lambda: self.unlink_class_(name), name in self.aliases)
+        
+    def link_class_(self, symbol:ClassSymbol)->None:
+        self.classes[symbol.name] = symbol 
+        for superclass in symbol.superclasses:
+            self.class_users_[superclass].add(symbol.name)
+        for superclass in self.superclasses(symbol.name):
+            self.subclasses_[superclass].add(symbol.name)
+            
+    def unlink_class_(self, name:str)->None:
+        for superclass in self.superclasses(name):
+            self.subclasses_[superclass].discard(name)
+        for superclass in self.classes.pop(name).superclasses:
+            self.class_users_[superclass].discard(name)
+            
+    def relink_(self, name:str, change, affects_users:bool=True)->None:
+        """
+        Apply change, which alters what name stands for, updating only the
+        subclass edges of classes whose superclasses reach name, directly or
+        through aliases
+        """
+        users = set()
+        if affects_users:
+            names = {name}
+            stack = [name]
+            while stack:
+                for alias in self.alias_users_.get(stack.pop(), ()):
+                    if alias not in names:
+                        names.add(alias)
+                        stack.append(alias)
+            for item in names:
+                users.update(self.class_users_.get(item, ()))
+        for user in users:
+            for superclass in self.superclasses(user):
+                self.subclasses_[superclass].discard(user)
+        change()
+        for user in users:
+            if user in self.classes:
+                for superclass in self.superclasses(user):
+                    self.subclasses_[superclass].add(user)
+        self.clear_cache_()
+        
+    def lookup(self, name:str)->ClassSymbol|None:
+        return self.classes.get(name)
+    
+    def expand(self, name:str)->List[str]:
+        """
+        @return The class names a name stands for, expanding local aliases
+        """
+        if name in self.classes or name not in self.aliases:
+            return [name]
+        output = []
+        seen = {name}
+        stack = list(reversed(self.aliases[name]))
+        while stack:
+            item = stack.pop()
+            if item in self.aliases and item not in self.classes:
+                if item not in seen:
+                    seen.add(item)
+                    stack.extend(reversed(self.aliases[item]))
+            elif item not in output:
+                output.append(item)
+        return output 
+    
+    def superclasses(self, name:str)->List[str]:
+        output = []
+        for superclass in self.classes[name].superclasses:
+            for item in self.expand(superclass):
+                if item not in output:
+                    output.append(item)
+        return output 
+    
+    def subclasses(self, name:str)->FrozenSet[str]:
+        return frozenset(self.subclasses_.get(name,()))
+    
+    def ancestors(self, name:str)->FrozenSet[str]:
+        """
+        @return Every declared class name inherits from, directly or not
+        """
+        if name not in self.ancestors_:
+            # Iterative post-order so deep hierarchies do not hit the recursion limit
+            pending = [(name,False)]
+            visiting = set()
+            while pending:
+                current, expanded = pending.pop()
+                if current in self.ancestors_:
+                    continue 
+                parents = [s for s in self.superclasses(current) if s in self.classes]
+                if expanded:
+                    visiting.discard(current)
+                    output = set(parents)
+                    for parent in parents:
+                        output |= self.ancestors_[parent]
+                    self.ancestors_[current] = frozenset(output)
+                    continue 
+                if current in visiting:
+                    raise SymbolError(f"Cyclic inheritance through {current}")
+                visiting.add(current)
+                pending.append((current,True))
+                for parent in parents:
+                    if parent not in self.ancestors_:
+                        if parent in visiting:
+                            raise SymbolError(f"Cyclic inheritance through {parent}")
+                        pending.append((parent,False))
+        return self.ancestors_[name]
+    
+    def descendants(self, name:str)->FrozenSet[str]:
+        output = set()
+        stack = [name]
+        while stack:
+            for child in self.subclasses_.get(stack.pop(),()):
+                if child not in output:
+                    output.add(child)
+                    stack.append(child)
+        return frozenset(output)
+    
+    def is_subclass(self, name:str, superclass:str)->bool:
+        return name == superclass or superclass in self.ancestors(name)
+    
+    def mro(self, name:str)->Tuple[str,...]:
+        """
+        @return The C3 linearisation of name and its declared ancestors
+        """
+        if name not in self.mro_:
+            for ancestor in sorted(self.ancestors(name), key=lambda a: len(self.ancestors(a))):
+                if ancestor not in self.mro_:
+                    self.mro_[ancestor] = self.linearise_(ancestor)
+            self.mro_[name] = self.linearise_(name)
+        return self.mro_[name]
+    
+    def linearise_(self, name:str)->Tuple[str,...]:
+        parents = [s for s in self.superclasses(name) if s in self.classes]
+        sequences = [list(self.mro_[parent]) for parent in parents] + [parents]
+        output = [name]
+        while True:
+            sequences = [seq for seq in sequences if seq]
+            if not sequences:
+                return tuple(output)
+            for seq in sequences:
+                head = seq[0]
+                if not any(head in other[1:] for other in sequences):
+                    break 
+            else:
+                raise SymbolError(f"Inconsistent method resolution order for {name}")
+            output.append(head)
+            for seq in sequences:
+                if seq[0] == head:
+                    del seq[0]
+    
+    def method_table(self, name:str)->Dict[Tuple[str,Tuple[str,...]],MethodSymbol]:
+        """
+        @return The method each (method name, parameter type spellings) pair
+        of instances of class name resolves to
+        """
+        if name not in self.method_tables_:
+            table = {}
+            for owner in reversed(self.mro(name)):
+                for method in self.classes[owner].iter_methods():
+                    table[method.key] = method 
+            self.method_tables_[name] = table 
+        return self.method_tables_[name]
+    
+    def resolve_method(self, name:str, method:str, 
+                       parameter_types:Iterable[str]|None=None)->MethodSymbol|None:
+        """
+        @param parameter_types Spellings of the parameter types selecting an
+        overload, e.g. ["Point"]; by default the first overload declared by
+        the nearest class in the method resolution order
+        @return The declaration of method that instances of class name use
+        """
+        if parameter_types is not None:
+            return self.method_table(name).get((method, tuple("".join(t.split()) for t in parameter_types)))
+        for owner in self.mro(name):
+            overloads = self.classes[owner].methods.get(method)
+            if overloads:
+                return self.method_table(name)[overloads[0].key]
+        return None 
+    
+    def overloads(self, name:str, method:str)->List[MethodSymbol]:
+        """
+        @return Every overload of method that instances of class name use
+        """
+        return [symbol for key, symbol in self.method_table(name).items() if key[0] == method]
+    
+    def resolve_type(self, name:str)->bool:
+        return name in self.classes or name in self.aliases
+    
+    def validate(self, names:Iterable[str]|None=None)->List[SymbolError]:
+        """
+        Check superclass and type references and that every override method
+        overrides a method of an ancestor
+        @param names Classes to check, all classes by default
+        @return Every problem found
+        """
+        errors = []
+        names = self.classes if names is None else [name for name in names if name in self.classes]
+        for name in names:
+            symbol = self.classes[name]
+            for superclass in self.superclasses(name):
+                if superclass not in self.classes:
+                    errors.append(SymbolError(f"Unknown superclass {superclass} of {name}"))
+            try:
+                mro = self.mro(name)
+            except SymbolError as error:
+                errors.append(error)
+                continue 
+            inherited = {method.key for ancestor in mro[1:] for method in self.classes[ancestor].iter_methods()}
+            for method in symbol.iter_methods():
+                if method.override and method.key not in inherited:
+                    errors.append(SymbolError(f"{name}.{method.name} overrides no inherited method"))
+            types = [field.var_type for field in symbol.fields.values()]
+            for method in symbol.iter_methods():
+                types.append(method.return_type)
+                types.extend(method.parameter_types)
+            for var_type in types:
+                for reference in referenced_classes(var_type):
+                    if not self.resolve_type(reference):
+                        errors.append(SymbolError(f"Unknown type {reference} in {name}"))
+        return errors 
@@ -0,0 +1,137 @@
+from __future__ import annotations
+import os
+import threading
+from typing import Callable, Dict, List, Tuple
+
+from parser import Compiler
+
+try:
+    import inotify_simple
+except ImportError:
+    inotify_simple = None 
+
+class WatchEvent:
+    """
+    One recompilation: the files that changed or disappeared, the classes
+    affected by them and the problems found in those classes
+    """
+    __slots__ = ("changed","removed","affected","errors")
+    
+    def __init__(self, changed:List[str], removed:List[str], affected:set, errors:list):
+        self.changed = changed 
+        self.removed = removed 
+        self.affected = affected 
+        self.errors = errors 
+
+class Watcher:
+    """
+    Long running watch mode for a Compiler. The watched directory is
+    snapshotted by (mtime, size) of every .oml file; only files whose entry
+    changed are recompiled, and classes inheriting from classes declared in
+    them are re-validated.
+    
+    When the optional inotify_simple package is available the watcher sleeps
+    until the directory reports a change instead of waking every interval.
+    A recursive compiler has every directory below its path watched too,
+    including directories created while watching.
+    """
+    def __init__(self, compiler:Compiler, interval:float=0.5, use_inotify:bool|None=None):
+        self.compiler = compiler 
+        self.interval = interval 
+        self.use_inotify = inotify_simple is not None if use_inotify is None else use_inotify
+        self.snapshot_ = {}
+        self.watched_ = set()
+        
+    def snapshot(self)->Dict[str,Tuple[int,int]]:
+        output = {}
+        for path in self.compiler.file_manager.iter_files(refresh=True):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue 
+            output[path] = (stat.st_mtime_ns, stat.st_size)
+        return output 
+    
+    def start(self)->WatchEvent:
+        """
+        Compile everything once and take the first snapshot
+        """
+        self.snapshot_ = self.snapshot()
+        files = sorted(self.snapshot_)
+        self.compiler.compile_files(files)
+        table = self.compiler.build_symbol_table()
+        return WatchEvent(files, [], set(table.classes), table.validate())
+    
+    def step(self)->WatchEvent|None:
+        """
+        Recompile whatever changed since the last snapshot
+        @return The resulting event, or None if nothing changed
+        """
+        snapshot = self.snapshot()
+        changed = sorted(path for path, entry in snapshot.items() if self.snapshot_.get(path) != entry)
+        removed = sorted(path for path in self.snapshot_ if path not in snapshot)
+        self.snapshot_ = snapshot 
+        if not changed and not removed:
+            return None 
+        affected = self.compiler.refresh(changed, removed)
+        return WatchEvent(changed, removed, affected, self.compiler.symbol_table.validate(affected))
+    
+    def run(self, callback:Callable[[WatchEvent],None]|None=None, 
+            stop_event:threading.Event|None=None)->None:
+        """
+        Watch until stop_event is set, calling callback with every event
+        """
+        stop_event = stop_event if stop_event is not None else threading.Event()
+        event = self.start()
+        if callback is not None:
+            callback(event)
+        notifier = self.open_notifier_()
+        try:
+            while not stop_event.is_set():
+                if notifier is not None:
+                    # Any event only wakes the watcher; the snapshot decides what changed
+                    events = notifier.read(timeout=int(self.interval*1000))
+                    if any(event.mask & inotify_simple.flags.ISDIR for event in events):
+                        self.add_watches_(notifier)
+                else:
+                    stop_event.wait(self.interval)
+                event = self.step()
+                if event is not None and callback is not None:
+                    callback(event)
+        finally:
+            if notifier is not None:
+                notifier.close()
+                
+    def open_notifier_(self):
+        if not self.use_inotify or inotify_simple is None or not os.path.isdir(self.compiler.path):
+            return None 
+        notifier = inotify_simple.INotify()
+        self.watched_ = set()
+        self.add_watches_(notifier)
+        return notifier 
+    
+    def add_watches_(self, notifier)->None:
+        """
+        Watch the compiler's directory and, when it is recursive, every
+        directory below it not watched yet
+        """
+        flags = inotify_simple.flags
+        mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.MOVED_FROM | flags.CREATE | flags.DELETE
+        file_manager = self.compiler.file_manager
+        if not os.path.isdir(self.compiler.path):
+            return 
+        # FileManager's walk visits a directory once however many links reach it
+        directories = [directory for directory, _ in 
+                       file_manager.walk_(self.compiler.path, file_manager.recursive, 
+                                          file_manager.exclude, file_manager.follow_symlinks)]
+        # The kernel drops the watch of a deleted directory
+        self.watched_.intersection_update(directories)
+        for directory in directories:
+            if directory in self.watched_:
+                continue 
+            try:
+                notifier.add_watch(directory, mask)
+            except OSError:
+                # Removed since the walk
+                continue 
+            self.watched_.add(directory) 